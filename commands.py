@@ -0,0 +1,90 @@
+import click
+from flask.cli import AppGroup
+from rollup import rebuild_rollup
+from inventory import rebuild_reservations
+from search import build_search_index
+from migrations import MIGRATIONS, applied_versions, upgrade
+from stats import invalidate
+from ledger import take_snapshots, reconcile, LedgerError
+from seed import seed_users, seed_products
+
+wms_cli = AppGroup('wms', help='Comandos de manutenção do WMS.')
+
+@wms_cli.command('rebuild-rollup')
+def rebuild_rollup_command():
+    rows = rebuild_rollup()
+    invalidate('movements')
+    click.echo(f'Resumo diário de movimentações reconstruído: {rows} linhas.')
+
+@wms_cli.command('rebuild-reservations')
+def rebuild_reservations_command():
+    rows = rebuild_reservations()
+    invalidate('stock')
+    click.echo(f'Reservas recalculadas para {rows} produtos.')
+
+@wms_cli.command('build-search-index')
+def build_search_index_command():
+    statements = build_search_index()
+    click.echo(f'Índices de busca de produtos atualizados ({statements} comandos executados).')
+
+@wms_cli.command('init-db')
+@click.option('--seed', 'with_seed', is_flag=True, help='Cria também os usuários padrão e os produtos de exemplo.')
+def init_db_command(with_seed):
+    applied = upgrade()
+    click.echo(f'Banco de dados inicializado ({len(applied)} migrações aplicadas).')
+    if with_seed:
+        _seed()
+
+@wms_cli.command('seed')
+def seed_command():
+    _seed()
+
+def _seed():
+    users = seed_users()
+    for user in users:
+        click.echo(f"Usuário criado - Usuário: {user['username']}, Senha: {user['password']}")
+    if not users:
+        click.echo('Usuários já existem, nenhum usuário criado.')
+    
+    products = seed_products()
+    if products:
+        click.echo(f'{products} produtos de exemplo criados.')
+    else:
+        click.echo('Produtos já existem, nenhum produto criado.')
+
+@wms_cli.command('migrate')
+@click.option('--to', 'target', type=int, help='Aplica as migrações somente até esta versão.')
+def migrate_command(target):
+    applied = upgrade(target)
+    for version, name in applied:
+        click.echo(f'Migração {version:03d} aplicada: {name}')
+    if not applied:
+        click.echo('Banco de dados já está atualizado.')
+
+@wms_cli.command('migrations')
+def migrations_command():
+    done = applied_versions()
+    for version, name, migrate in MIGRATIONS:
+        applied_at = done.get(version)
+        status = applied_at.strftime('%d/%m/%Y %H:%M') if applied_at else 'pendente'
+        click.echo(f'{version:03d}  {name:<30}  {status}')
+
+@wms_cli.command('snapshot-stock')
+@click.option('--min-movements', default=1, show_default=True, type=click.IntRange(min=1), help='Movimentações desde o último snapshot necessárias para gerar um novo.')
+def snapshot_stock_command(min_movements):
+    created = take_snapshots(min_movements=min_movements)
+    click.echo(f'{created} snapshots de estoque gerados.')
+
+@wms_cli.command('reconcile-stock')
+@click.option('--fix', is_flag=True, help='Corrige Product.quantity com o saldo do razão.')
+def reconcile_stock_command(fix):
+    try:
+        drift = reconcile(fix=fix)
+    except LedgerError as e:
+        raise click.ClickException(str(e))
+    for product_id, code, quantity, expected in drift:
+        click.echo(f'{code}: cadastro {quantity}, razão {expected} (diferença {quantity - expected:+d})')
+    if drift:
+        invalidate('stock', 'categories')
+    action = 'corrigidos' if fix else 'divergentes'
+    click.echo(f'{len(drift)} produtos {action}.')
@@ -0,0 +1,62 @@
+import os
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import Pool
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_TIMEOUT = 10
+DEFAULT_POOL_RECYCLE = 300
+DEFAULT_IDLE_PING = 30
+
+_idle_ping = DEFAULT_IDLE_PING
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+def engine_options(uri):
+    options = {'pool_recycle': _env_int('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)}
+    if uri and not uri.startswith('sqlite'):
+        options.update({
+            'pool_size': _env_int('DB_POOL_SIZE', DEFAULT_POOL_SIZE),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+            'pool_use_lifo': True,
+        })
+    if uri and uri.startswith('postgresql'):
+        options['connect_args'] = {
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 3,
+        }
+    return options
+
+def _on_checkin(dbapi_connection, connection_record):
+    connection_record.info['checked_in_at'] = time.monotonic()
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    checked_in_at = connection_record.info.pop('checked_in_at', None)
+    if checked_in_at is None or time.monotonic() - checked_in_at < _idle_ping:
+        return
+    
+    try:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+    except Exception:
+        raise exc.DisconnectionError()
+
+def init_app(app):
+    global _idle_ping
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config.get('SQLALCHEMY_DATABASE_URI')))
+    app.config.setdefault('DB_IDLE_PING', _env_int('DB_IDLE_PING', DEFAULT_IDLE_PING))
+    _idle_ping = app.config['DB_IDLE_PING']
+    
+    if not event.contains(Pool, 'checkin', _on_checkin):
+        event.listen(Pool, 'checkin', _on_checkin)
+    if not event.contains(Pool, 'checkout', _on_checkout):
+        event.listen(Pool, 'checkout', _on_checkout)
@@ -0,0 +1,77 @@
+from datetime import datetime
+from models import db, Shipment, ShipmentItem
+from inventory import lock_products, consume_reserved
+from events import queue_shipment
+from ledger import record_shipments
+
+def dispatch_shipments(shipment_ids, user_id):
+    shipment_ids = sorted(set(shipment_ids))
+    shipments = (
+        db.session.query(Shipment.id, Shipment.order_number, Shipment.status, Shipment.shipped_at)
+        .filter(Shipment.id.in_(shipment_ids))
+        .order_by(Shipment.id)
+        .with_for_update()
+        .all()
+    )
+    found = {shipment.id: shipment for shipment in shipments}
+    
+    failed = []
+    for shipment_id in shipment_ids:
+        if shipment_id not in found:
+            failed.append({'id': shipment_id, 'order_number': None, 'message': 'expedição não encontrada'})
+        elif found[shipment_id].shipped_at:
+            failed.append({'id': shipment_id, 'order_number': found[shipment_id].order_number, 'message': 'expedição já enviada'})
+    
+    pending = [shipment for shipment in shipments if not shipment.shipped_at]
+    demand = {shipment.id: {} for shipment in pending}
+    rows = (
+        db.session.query(ShipmentItem.shipment_id, ShipmentItem.product_id, db.func.sum(ShipmentItem.quantity))
+        .filter(ShipmentItem.shipment_id.in_(list(demand)))
+        .group_by(ShipmentItem.shipment_id, ShipmentItem.product_id)
+        .all()
+    ) if demand else []
+    for shipment_id, product_id, quantity in rows:
+        demand[shipment_id][product_id] = quantity
+    
+    products = lock_products({product_id for items in demand.values() for product_id in items})
+    available = {product_id: product.quantity for product_id, product in products.items()}
+    
+    shipped = []
+    totals = {}
+    entries = []
+    for shipment in pending:
+        items = demand[shipment.id]
+        shortages = [
+            f'{products[product_id].name} (disponível: {available[product_id]}, necessário: {quantity})'
+            for product_id, quantity in items.items()
+            if available[product_id] < quantity
+        ]
+        if shortages:
+            failed.append({
+                'id': shipment.id,
+                'order_number': shipment.order_number,
+                'message': 'estoque insuficiente: ' + ', '.join(shortages)
+            })
+            continue
+        
+        for product_id, quantity in items.items():
+            available[product_id] -= quantity
+            totals[product_id] = totals.get(product_id, 0) + quantity
+        entries.append((shipment.order_number, items))
+        shipped.append({'id': shipment.id, 'order_number': shipment.order_number})
+    
+    if shipped:
+        shipped_ids = [shipment['id'] for shipment in shipped]
+        consume_reserved(totals)
+        record_shipments(entries, user_id)
+        db.session.execute(
+            db.update(Shipment)
+            .where(Shipment.id.in_(shipped_ids), Shipment.shipped_at.is_(None))
+            .values(status='shipped', shipped_at=datetime.utcnow())
+        )
+        for shipment in pending:
+            if shipment.id in shipped_ids:
+                queue_shipment(shipment.id, shipment.order_number, 'shipped', shipment.status)
+    
+    failed.sort(key=lambda shipment: shipment['id'])
+    return shipped, failed
@@ -0,0 +1,230 @@
+import fcntl
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from models import db, Product
+
+STOCK_EVENT_LIMIT = 100
+POLL_INTERVAL = 0.5
+SUBSCRIBER_QUEUE_SIZE = 200
+
+_lock = threading.Lock()
+_subscribers = set()
+_listener = None
+_pid = None
+
+class Subscriber:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = False
+
+def init_app(app):
+    app.config.setdefault('EVENTS_LOG', os.path.join(tempfile.gettempdir(), 'wms_events.log'))
+    app.config.setdefault('EVENTS_LOG_MAX_BYTES', 1024 * 1024)
+    app.config.setdefault('EVENTS_HEARTBEAT', 15)
+    app.config.setdefault('EVENTS_STREAM_TIMEOUT', 300)
+    app.config.setdefault('EVENTS_STREAM_ENABLED', None)
+    app.config.setdefault('EVENTS_MAX_STREAMS', 8)
+    app.config.setdefault('EVENTS_FULL_RETRY', 30)
+    
+    if not event.contains(db.session, 'before_commit', _collect_stock):
+        event.listen(db.session, 'before_commit', _collect_stock)
+        event.listen(db.session, 'after_commit', _publish_outbox)
+        event.listen(db.session, 'after_rollback', _discard_outbox)
+
+def _state():
+    return db.session.info.setdefault('events', {'outbox': [], 'previous': {}, 'touched': set()})
+
+def queue_event(kind, data):
+    _state()['outbox'].append((kind, data))
+
+def track_quantities(previous):
+    state = _state()
+    for product_id, quantity in previous.items():
+        state['previous'].setdefault(product_id, quantity)
+        state['touched'].add(product_id)
+
+def track_products(product_ids):
+    _state()['touched'].update(product_ids)
+
+def queue_movement(movement, product, user_name):
+    queue_event('movement', {
+        'id': movement.id,
+        'product_id': product.id,
+        'product_name': product.name,
+        'type': movement.type,
+        'quantity': movement.quantity,
+        'user_name': user_name,
+        'notes': movement.notes,
+        'created_at': movement.created_at.strftime('%d/%m/%Y %H:%M') if movement.created_at else None
+    })
+
+def queue_shipment(shipment_id, order_number, status, previous_status=None):
+    queue_event('shipment', {
+        'id': shipment_id,
+        'order_number': order_number,
+        'status': status,
+        'previous_status': previous_status
+    })
+
+def _collect_stock(session):
+    state = session.info.get('events')
+    if not state or not state['touched']:
+        return
+    
+    touched, previous = state['touched'], state['previous']
+    if len(touched) > STOCK_EVENT_LIMIT:
+        state['outbox'].append(('refresh', {'scope': 'stock'}))
+    else:
+        rows = (
+            session.query(Product.id, Product.code, Product.name, Product.quantity,
+                          Product.reserved_quantity, Product.min_quantity)
+            .filter(Product.id.in_(list(touched)))
+            .all()
+        )
+        for row in rows:
+            quantity, min_quantity = row.quantity or 0, row.min_quantity or 0
+            before = previous.get(row.id)
+            state['outbox'].append(('stock', {
+                'product_id': row.id,
+                'code': row.code,
+                'name': row.name,
+                'quantity': quantity,
+                'previous_quantity': before,
+                'reserved_quantity': row.reserved_quantity,
+                'available_quantity': quantity - row.reserved_quantity,
+                'min_quantity': min_quantity
+            }))
+            if before is not None and (before <= min_quantity) != (quantity <= min_quantity):
+                state['outbox'].append(('low_stock', {
+                    'product_id': row.id,
+                    'code': row.code,
+                    'name': row.name,
+                    'quantity': quantity,
+                    'min_quantity': min_quantity,
+                    'low_stock': quantity <= min_quantity
+                }))
+    touched.clear()
+    previous.clear()
+
+def _publish_outbox(session):
+    state = session.info.pop('events', None)
+    if not state or not state['outbox'] or not has_app_context():
+        return
+    try:
+        publish(state['outbox'])
+    except OSError:
+        current_app.logger.exception('Falha ao publicar eventos')
+
+def _discard_outbox(session):
+    session.info.pop('events', None)
+
+def publish(events):
+    path = current_app.config['EVENTS_LOG']
+    lines = ''.join(
+        json.dumps({'event': kind, 'data': data}, default=str) + '\n'
+        for kind, data in events
+    )
+    with open(path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if os.path.exists(path) and os.path.getsize(path) > current_app.config['EVENTS_LOG_MAX_BYTES']:
+                os.replace(path, path + '.1')
+            with open(path, 'a', encoding='utf-8') as log:
+                log.write(lines)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _open_log(path, at_end):
+    open(path, 'a').close()
+    log = open(path, encoding='utf-8')
+    if at_end:
+        log.seek(0, os.SEEK_END)
+    return log
+
+def _broadcast(lines):
+    messages = []
+    for line in lines:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        messages.append(f'event: {message["event"]}\ndata: {json.dumps(message["data"])}\n\n')
+    
+    with _lock:
+        subscribers = list(_subscribers)
+    for subscriber in subscribers:
+        for message in messages:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.dropped = True
+                unsubscribe(subscriber)
+                break
+
+def _follow(path):
+    log = _open_log(path, at_end=True)
+    pending = ''
+    while True:
+        chunk = log.read()
+        if chunk:
+            pending += chunk
+            *lines, pending = pending.split('\n')
+            _broadcast(line for line in lines if line)
+            continue
+        
+        try:
+            rotated = os.stat(path).st_ino != os.fstat(log.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = False
+        if rotated:
+            lines = (pending + log.read()).split('\n')
+            _broadcast(line for line in lines if line)
+            log.close()
+            log = _open_log(path, at_end=False)
+            pending = ''
+            continue
+        time.sleep(POLL_INTERVAL)
+
+def _listen(app):
+    path = app.config['EVENTS_LOG']
+    while True:
+        try:
+            _follow(path)
+        except Exception:
+            app.logger.exception('Falha ao ler o log de eventos')
+            _broadcast([json.dumps({'event': 'refresh', 'data': {'scope': 'all'}})])
+            time.sleep(POLL_INTERVAL)
+
+def stream_enabled(app, environ):
+    enabled = app.config['EVENTS_STREAM_ENABLED']
+    if enabled is None:
+        return bool(environ.get('wsgi.multithread'))
+    return enabled
+
+def subscribe(app):
+    global _listener, _pid
+    subscriber = Subscriber()
+    with _lock:
+        if len(_subscribers) >= app.config['EVENTS_MAX_STREAMS']:
+            return None
+        if _listener is None or _pid != os.getpid() or not _listener.is_alive():
+            _listener = threading.Thread(
+                target=_listen,
+                args=(app,),
+                name='wms-events',
+                daemon=True
+            )
+            _listener.start()
+            _pid = os.getpid()
+        _subscribers.add(subscriber)
+    return subscriber
+
+def unsubscribe(subscriber):
+    with _lock:
+        _subscribers.discard(subscriber)
@@ -0,0 +1,37 @@
+import multiprocessing
+import os
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'sync':
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count * 2 + 1))
+    threads = 1
+else:
+    workers = int(os.environ.get('WEB_CONCURRENCY', max(2, cpu_count)))
+    threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 200))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+concurrency = worker_connections if worker_class == 'gevent' else threads
+pool_size = min(concurrency, 10)
+os.environ.setdefault('DB_POOL_SIZE', str(pool_size))
+os.environ.setdefault('DB_MAX_OVERFLOW', str(min(concurrency, 30) - pool_size + 2))
+os.environ.setdefault('EVENTS_MAX_STREAMS', str(max(1, concurrency // 2)))
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning('psycogreen não instalado: consultas PostgreSQL vão bloquear o worker gevent')
+        return
+    patch_psycopg()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+from models import db, User
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_generation = 0
+_stamp_seen = None
+
+class CachedUser(UserMixin):
+    def __init__(self, id, username, name, email, role, active):
+        self.id = id
+        self.username = username
+        self.name = name
+        self.email = email
+        self.role = role
+        self.active = active
+    
+    @property
+    def is_active(self):
+        return bool(self.active)
+    
+    def is_admin(self):
+        return self.role == 'admin'
+    
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+def init_app(app):
+    app.config.setdefault('USER_CACHE_TTL', 60)
+    app.config.setdefault('USER_CACHE_SIZE', 1024)
+    app.config.setdefault('USER_CACHE_STAMP', os.path.join(tempfile.gettempdir(), 'wms_user_cache.stamp'))
+
+def _stamp():
+    try:
+        return os.stat(current_app.config['USER_CACHE_STAMP']).st_mtime_ns
+    except OSError:
+        return None
+
+def load_user(user_id):
+    global _stamp_seen
+    now = time.monotonic()
+    stamp = _stamp()
+    with _lock:
+        if stamp != _stamp_seen:
+            _cache.clear()
+            _stamp_seen = stamp
+        entry = _cache.get(user_id)
+        if entry and entry[0] > now:
+            _cache.move_to_end(user_id)
+            return entry[1]
+        generation = _generation
+    
+    row = (
+        db.session.query(User.id, User.username, User.name, User.email, User.role, User.active)
+        .filter_by(id=user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    user = CachedUser(*row)
+    
+    with _lock:
+        if _generation == generation:
+            _cache[user_id] = (now + current_app.config['USER_CACHE_TTL'], user)
+            _cache.move_to_end(user_id)
+            while len(_cache) > current_app.config['USER_CACHE_SIZE']:
+                _cache.popitem(last=False)
+    return user
+
+def invalidate_user(user_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        _cache.pop(user_id, None)
+    
+    path = current_app.config['USER_CACHE_STAMP']
+    with open(path, 'a'):
+        pass
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
@@ -0,0 +1,378 @@
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Product, Movement, ShipmentItem
+from inventory import update_quantities, reserve_quantities
+from rollup import record_batch
+from ledger import open_balances
+
+MAX_BATCH_LINES = 10000
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+MOVEMENT_TYPES = ('entrada', 'saida', 'ajuste')
+ITEM_HEADER_FIELDS = ('code', 'codigo', 'código', 'product_id', 'id')
+
+class BatchTooLarge(ValueError):
+    pass
+
+def _csv_records(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    header = text.readline()
+    delimiter = max(',;\t', key=header.count)
+    reader = csv.DictReader(itertools.chain([header], text), delimiter=delimiter)
+    for record in reader:
+        yield {(key or '').strip().lower(): value for key, value in record.items()}
+
+def _json_lines(stream):
+    for number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            raise ValueError(f'Linha {number}: JSON inválido.')
+
+def _xlsx_records(stream):
+    from openpyxl import load_workbook
+    
+    wb = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(value or '').strip().lower() for value in next(rows, [])]
+        for row in rows:
+            if any(value is not None for value in row):
+                yield dict(zip(header, row))
+    finally:
+        wb.close()
+
+def pasted_records(text):
+    lines = [line.strip() for line in (text or '').splitlines() if line.strip()]
+    if not lines:
+        return
+    
+    delimiter = max(',;\t', key=lines[0].count)
+    if lines[0].count(delimiter) == 0:
+        rows = (line.split() for line in lines)
+    else:
+        rows = csv.reader(lines, delimiter=delimiter)
+    
+    header = None
+    for row in rows:
+        row = [value.strip() for value in row]
+        if header is None and row[0].lower() in ITEM_HEADER_FIELDS:
+            header = [value.lower() for value in row]
+            continue
+        if header:
+            yield dict(zip(header, row))
+        else:
+            yield {'code': row[0], 'quantity': row[1] if len(row) > 1 else None}
+
+def read_records(request):
+    upload = request.files.get('file')
+    if upload:
+        name = (upload.filename or '').lower()
+        if name.endswith(('.jsonl', '.ndjson')):
+            return _json_lines(upload.stream)
+        if name.endswith('.xlsx'):
+            return _xlsx_records(upload.stream)
+        return _csv_records(upload.stream)
+    
+    mimetype = request.mimetype
+    if mimetype == 'application/json':
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('movements') or data.get('products') or data.get('items')
+        if not isinstance(data, list):
+            raise ValueError('Envie uma lista de registros em JSON.')
+        return iter(data)
+    if mimetype in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return _json_lines(request.stream)
+    if mimetype in ('text/csv', 'text/plain'):
+        return _csv_records(request.stream)
+    raise ValueError('Formato não suportado. Use JSON, JSON Lines ou CSV.')
+
+def limited(records, limit=MAX_BATCH_LINES):
+    for number, record in enumerate(records, 1):
+        if number > limit:
+            raise BatchTooLarge(f'O lote excede o limite de {limit} linhas.')
+        yield number, record
+
+def validate_movement(movement_type, quantity):
+    if movement_type not in MOVEMENT_TYPES:
+        raise ValueError(f'tipo inválido: {movement_type or "vazio"}')
+    if quantity < 0 or (quantity == 0 and movement_type != 'ajuste'):
+        raise ValueError('quantidade deve ser positiva')
+
+def _parse_movement(record):
+    if not isinstance(record, dict):
+        raise ValueError('registro inválido')
+    
+    code = str(record.get('code') or record.get('codigo') or '').strip()
+    movement_type = str(record.get('type') or record.get('tipo') or '').strip().lower()
+    notes = str(record.get('notes') or record.get('observacoes') or '').strip()
+    if not code:
+        raise ValueError('código do produto ausente')
+    if movement_type not in MOVEMENT_TYPES:
+        raise ValueError(f'tipo inválido: {movement_type or "vazio"}')
+    
+    try:
+        quantity = int(record.get('quantity', record.get('quantidade')))
+    except (TypeError, ValueError):
+        raise ValueError('quantidade inválida')
+    validate_movement(movement_type, quantity)
+    
+    return code, movement_type, quantity, notes
+
+def ingest_movements(records, user_id):
+    errors = []
+    lines = []
+    for number, record in limited(records):
+        try:
+            lines.append((number,) + _parse_movement(record))
+        except ValueError as e:
+            errors.append({'line': number, 'message': str(e)})
+    
+    codes = {code for number, code, movement_type, quantity, notes in lines}
+    products = {
+        row.code: row
+        for row in db.session.query(Product.id, Product.code, Product.category, Product.quantity, Product.reserved_quantity)
+        .filter(Product.code.in_(codes), Product.active)
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    } if codes else {}
+    
+    now = datetime.utcnow()
+    stock = {product.id: product.quantity for product in products.values()}
+    rows = []
+    for number, code, movement_type, quantity, notes in lines:
+        product = products.get(code)
+        if product is None:
+            errors.append({'line': number, 'message': f'produto {code} não encontrado'})
+            continue
+        
+        current = stock[product.id]
+        if movement_type == 'entrada':
+            stock[product.id] = current + quantity
+        elif movement_type == 'saida':
+            available = current - product.reserved_quantity
+            if available < quantity:
+                errors.append({'line': number, 'message': f'estoque insuficiente para {code} (disponível: {available})'})
+                continue
+            stock[product.id] = current - quantity
+        else:
+            stock[product.id] = quantity
+        
+        rows.append({
+            'product_id': product.id,
+            'type': movement_type,
+            'quantity': quantity,
+            'user_id': user_id,
+            'notes': notes,
+            'created_at': now
+        })
+    
+    if rows:
+        update_quantities({
+            product.id: stock[product.id] - product.quantity
+            for product in products.values()
+        })
+        db.session.execute(db.insert(Movement), rows)
+        categories = {product.id: product.category for product in products.values()}
+        record_batch(
+            (row['product_id'], categories[row['product_id']], now, row['type'], row['quantity'])
+            for row in rows
+        )
+    
+    errors.sort(key=lambda error: error['line'])
+    return len(rows), errors
+
+def _field(record, *names):
+    for name in names:
+        value = record.get(name)
+        if value is not None and str(value).strip() != '':
+            return str(value).strip()
+    return None
+
+def _int_field(record, default, *names):
+    value = _field(record, *names)
+    if value is None:
+        return default
+    try:
+        number = int(float(value))
+    except ValueError:
+        raise ValueError(f'{names[0]} inválido: {value}')
+    if number < 0:
+        raise ValueError(f'{names[0]} não pode ser negativo')
+    return number
+
+def _parse_product(record):
+    if not isinstance(record, dict):
+        raise ValueError('registro inválido')
+    
+    code = _field(record, 'code', 'codigo', 'código')
+    name = _field(record, 'name', 'nome')
+    category = _field(record, 'category', 'categoria')
+    if not code or len(code) > 50:
+        raise ValueError('código ausente ou com mais de 50 caracteres')
+    if not name or len(name) > 200:
+        raise ValueError('nome ausente ou com mais de 200 caracteres')
+    if not category or len(category) > 100:
+        raise ValueError('categoria ausente ou com mais de 100 caracteres')
+    
+    return {
+        'code': code,
+        'name': name,
+        'description': _field(record, 'description', 'descricao', 'descrição') or '',
+        'category': category,
+        'unit': (_field(record, 'unit', 'unidade') or 'UN')[:20],
+        'quantity': _int_field(record, 0, 'quantity', 'quantidade'),
+        'min_quantity': _int_field(record, 10, 'min_quantity', 'estoque_minimo'),
+        'location': (_field(record, 'location', 'localizacao', 'localização') or '')[:100],
+        'active': True
+    }
+
+def _upsert_products(rows):
+    now = datetime.utcnow()
+    for row in rows:
+        row['created_at'] = now
+        row['updated_at'] = now
+    updated_columns = ('name', 'description', 'category', 'unit', 'min_quantity', 'location', 'active', 'updated_at')
+    
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(Product.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['code'],
+            set_={column: stmt.excluded[column] for column in updated_columns}
+        )
+        db.session.execute(stmt, rows)
+        return
+    
+    existing = {
+        product.code: product
+        for product in Product.query.filter(Product.code.in_([row['code'] for row in rows])).all()
+    }
+    for row in rows:
+        product = existing.get(row['code'])
+        if product is None:
+            db.session.add(Product(**row))
+        else:
+            for column in updated_columns:
+                setattr(product, column, row[column])
+
+def import_products(records, user_id, chunk_size=IMPORT_CHUNK_SIZE):
+    imported = 0
+    errors = []
+    total_errors = 0
+    chunk = {}
+    
+    def flush():
+        nonlocal imported
+        if chunk:
+            _upsert_products(list(chunk.values()))
+            open_balances(user_id, list(chunk))
+            db.session.commit()
+            imported += len(chunk)
+            chunk.clear()
+    
+    for number, record in enumerate(records, 1):
+        try:
+            row = _parse_product(record)
+        except ValueError as e:
+            total_errors += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': number, 'message': str(e)})
+            continue
+        
+        chunk.pop(row['code'], None)
+        chunk[row['code']] = row
+        if len(chunk) >= chunk_size:
+            flush()
+    
+    flush()
+    return imported, errors, total_errors
+
+def _parse_item(record):
+    if not isinstance(record, dict):
+        raise ValueError('registro inválido')
+    
+    code = _field(record, 'code', 'codigo', 'código')
+    product_id = _field(record, 'product_id', 'id')
+    if not code and not product_id:
+        raise ValueError('código do produto ausente')
+    
+    try:
+        quantity = int(_field(record, 'quantity', 'quantidade') or '')
+    except ValueError:
+        raise ValueError('quantidade inválida')
+    if quantity <= 0:
+        raise ValueError('quantidade deve ser positiva')
+    
+    if code:
+        return code, None, quantity
+    try:
+        return None, int(product_id), quantity
+    except ValueError:
+        raise ValueError(f'produto inválido: {product_id}')
+
+def add_shipment_items(shipment_id, records):
+    errors = []
+    lines = []
+    for number, record in limited(records):
+        try:
+            lines.append((number,) + _parse_item(record))
+        except ValueError as e:
+            errors.append({'line': number, 'message': str(e)})
+    
+    codes = {code for number, code, product_id, quantity in lines if code}
+    ids = {product_id for number, code, product_id, quantity in lines if product_id is not None}
+    conditions = []
+    if codes:
+        conditions.append(Product.code.in_(codes))
+    if ids:
+        conditions.append(Product.id.in_(ids))
+    rows = (
+        db.session.query(Product.id, Product.code, Product.quantity, Product.reserved_quantity)
+        .filter(db.or_(*conditions), Product.active)
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    ) if conditions else []
+    by_code = {row.code: row for row in rows}
+    by_id = {row.id: row for row in rows}
+    
+    requested = {}
+    for number, code, product_id, quantity in lines:
+        product = by_code.get(code) if code else by_id.get(product_id)
+        if product is None:
+            errors.append({'line': number, 'message': f'produto {code or product_id} não encontrado'})
+            continue
+        requested.setdefault(product.id, []).append((number, quantity))
+    
+    totals = {}
+    for product_id, entries in requested.items():
+        product = by_id[product_id]
+        total = sum(quantity for number, quantity in entries)
+        available = product.quantity - product.reserved_quantity
+        if total > available:
+            errors.extend(
+                {'line': number, 'message': f'estoque insuficiente para {product.code} (disponível: {available}, solicitado: {total})'}
+                for number, quantity in entries
+            )
+            continue
+        totals[product_id] = total
+    
+    if totals:
+        reserve_quantities(totals)
+        db.session.execute(db.insert(ShipmentItem), [
+            {'shipment_id': shipment_id, 'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in totals.items()
+        ])
+    
+    errors.sort(key=lambda error: error['line'])
+    return len(totals), errors
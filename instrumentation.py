@@ -0,0 +1,242 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_QUERY_BUDGET = 20
+SAMPLE_SIZE = 1000
+HISTOGRAM_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+PERCENTILES = (50, 90, 95, 99)
+FLUSH_INTERVAL = 5
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+_last_flush = 0.0
+_reset_seen = 0.0
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class EndpointMetrics:
+    def __init__(self, maxlen=SAMPLE_SIZE):
+        self.samples = deque(maxlen=maxlen)
+        self.requests = 0
+        self.slowest_query = None
+    
+    def add(self, total_ms, db_ms, render_ms, query_count, slowest_query):
+        self.requests += 1
+        self.samples.append((total_ms, db_ms, render_ms, query_count))
+        if slowest_query and (self.slowest_query is None or slowest_query[0] > self.slowest_query[0]):
+            self.slowest_query = slowest_query
+    
+    def merge(self, data):
+        self.requests += data['requests']
+        self.samples.extend(tuple(sample) for sample in data['samples'])
+        slowest = data['slowest_query']
+        if slowest and (self.slowest_query is None or slowest[0] > self.slowest_query[0]):
+            self.slowest_query = tuple(slowest)
+    
+    def to_dict(self):
+        return {'requests': self.requests, 'samples': list(self.samples), 'slowest_query': self.slowest_query}
+    
+    def summary(self):
+        samples = list(self.samples)
+        totals = sorted(s[0] for s in samples)
+        histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for value in totals:
+            index = next((i for i, bound in enumerate(HISTOGRAM_BUCKETS) if value <= bound), len(HISTOGRAM_BUCKETS))
+            histogram[index] += 1
+        
+        return {
+            'requests': self.requests,
+            'percentiles': {p: _percentile(totals, p) for p in PERCENTILES},
+            'avg_db_ms': _average(s[1] for s in samples),
+            'avg_render_ms': _average(s[2] for s in samples),
+            'avg_queries': _average(s[3] for s in samples),
+            'max_queries': max((s[3] for s in samples), default=0),
+            'histogram': histogram,
+            'slowest_query': self.slowest_query
+        }
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+def _average(values):
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
+
+def query_budget(limit):
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+def histogram_labels():
+    labels = [f'≤ {bound} ms' for bound in HISTOGRAM_BUCKETS]
+    labels.append(f'> {HISTOGRAM_BUCKETS[-1]} ms')
+    return labels
+
+def _reset_stamp(app):
+    return os.path.join(app.config['METRICS_DIR'], 'reset')
+
+def _reset_time(app):
+    try:
+        return os.stat(_reset_stamp(app)).st_mtime
+    except FileNotFoundError:
+        return 0.0
+
+def flush_metrics(app, force=False):
+    global _last_flush, _reset_seen
+    now = time.time()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    
+    reset_at = _reset_time(app)
+    with _metrics_lock:
+        if reset_at > _reset_seen:
+            _metrics.clear()
+            _reset_seen = reset_at
+        endpoints = {endpoint: metrics.to_dict() for endpoint, metrics in _metrics.items()}
+    
+    path = os.path.join(app.config['METRICS_DIR'], f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'pid': os.getpid(), 'written_at': now, 'endpoints': endpoints}, f)
+    os.replace(path + '.tmp', path)
+
+def _worker_files(app):
+    directory = app.config['METRICS_DIR']
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            yield os.path.join(directory, name)
+
+def metrics_snapshot(app):
+    flush_metrics(app, force=True)
+    reset_at = _reset_time(app)
+    cutoff = time.time() - app.config['METRICS_RETENTION']
+    
+    merged = {}
+    workers = []
+    for path in _worker_files(app):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data['written_at'] < max(reset_at, cutoff):
+            continue
+        workers.append(data['pid'])
+        for endpoint, metrics in data['endpoints'].items():
+            merged.setdefault(endpoint, EndpointMetrics(maxlen=None)).merge(metrics)
+    
+    endpoints = sorted(
+        ((endpoint, metrics.summary()) for endpoint, metrics in merged.items()),
+        key=lambda item: item[1]['percentiles'][95],
+        reverse=True
+    )
+    return endpoints, sorted(workers)
+
+def reset_metrics(app):
+    global _reset_seen
+    open(_reset_stamp(app), 'a').close()
+    os.utime(_reset_stamp(app))
+    _reset_seen = _reset_time(app)
+    for path in _worker_files(app):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+    with _metrics_lock:
+        _metrics.clear()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get('query_count', 0) + 1
+        if current_app.config['INSTRUMENTATION_ENABLED'] and context is not None:
+            context.query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, 'query_start', None)
+    if start is None or not has_request_context():
+        return
+    
+    elapsed = (time.perf_counter() - start) * 1000
+    g.db_time = g.get('db_time', 0.0) + elapsed
+    slowest = g.get('slowest_query')
+    if slowest is None or elapsed > slowest[0]:
+        g.slowest_query = (elapsed, statement)
+
+def _before_render(sender, template, context, **extra):
+    if has_request_context():
+        g.render_start = time.perf_counter()
+
+def _after_render(sender, template, context, **extra):
+    start = g.pop('render_start', None) if has_request_context() else None
+    if start is not None:
+        g.render_time = g.get('render_time', 0.0) + (time.perf_counter() - start) * 1000
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+def _record_request(response):
+    start = g.get('request_start')
+    if start is None or request.endpoint is None:
+        return response
+    
+    total_ms = (time.perf_counter() - start) * 1000
+    db_ms = g.get('db_time', 0.0)
+    render_ms = g.get('render_time', 0.0)
+    query_count = g.get('query_count', 0)
+    
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={db_ms:.1f};desc="{query_count} consultas"',
+        f'render;dur={render_ms:.1f}',
+        f'total;dur={total_ms:.1f}'
+    ])
+    
+    with _metrics_lock:
+        metrics = _metrics.setdefault(request.endpoint, EndpointMetrics())
+        metrics.add(total_ms, db_ms, render_ms, query_count, g.get('slowest_query'))
+    flush_metrics(current_app)
+    return response
+
+def _check_query_budget(response):
+    if not (current_app.testing or current_app.config['QUERY_BUDGET_ENFORCE']):
+        return response
+    
+    view = current_app.view_functions.get(request.endpoint)
+    limit = getattr(view, 'query_budget', current_app.config['QUERY_BUDGET'])
+    count = g.get('query_count', 0)
+    if limit is not None and count > limit:
+        raise QueryBudgetExceeded(
+            f'{request.endpoint} executou {count} consultas (limite: {limit})'
+        )
+    return response
+
+def init_app(app):
+    app.config.setdefault('QUERY_BUDGET', DEFAULT_QUERY_BUDGET)
+    app.config.setdefault('QUERY_BUDGET_ENFORCE', False)
+    app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+    app.config.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'wms_metrics'))
+    app.config.setdefault('METRICS_RETENTION', 86400)
+    os.makedirs(app.config['METRICS_DIR'], exist_ok=True)
+    
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    app.after_request(_check_query_budget)
+    
+    if app.config['INSTRUMENTATION_ENABLED']:
+        if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+        app.before_request(_start_timer)
+        app.after_request(_record_request)
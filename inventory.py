@@ -0,0 +1,182 @@
+from models import db, Product, Shipment, ShipmentItem
+from events import track_quantities, track_products
+
+class ProductNotFound(Exception):
+    def __init__(self, product_id):
+        super().__init__(f'Produto {product_id} não encontrado.')
+        self.product_id = product_id
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        self.shortages = shortages
+        self.messages = [
+            f'Estoque insuficiente para {name}! Disponível: {available}, Necessário: {required}'
+            for product_id, name, available, required in shortages
+        ]
+        super().__init__('; '.join(self.messages))
+
+def _returning_supported():
+    return db.session.get_bind().dialect.update_returning
+
+def _available_row(product_id):
+    row = db.session.query(Product.name, Product.quantity, Product.reserved_quantity).filter_by(id=product_id).first()
+    if row is None:
+        raise ProductNotFound(product_id)
+    return row.name, row.quantity - row.reserved_quantity
+
+def apply_delta(product_id, delta):
+    stmt = (
+        db.update(Product)
+        .where(Product.id == product_id)
+        .values(quantity=Product.quantity + delta)
+    )
+    if delta < 0:
+        stmt = stmt.where(Product.quantity - Product.reserved_quantity + delta >= 0)
+    
+    if _returning_supported():
+        quantity = db.session.execute(stmt.returning(Product.quantity)).scalar()
+        updated = quantity is not None
+    else:
+        updated = db.session.execute(stmt).rowcount == 1
+        quantity = db.session.query(Product.quantity).filter_by(id=product_id).scalar() if updated else None
+    
+    if not updated:
+        name, available = _available_row(product_id)
+        raise InsufficientStock([(product_id, name, available, -delta)])
+    track_quantities({product_id: quantity - delta})
+    return quantity
+
+def set_quantity(product_id, quantity):
+    previous = db.session.query(Product.quantity).filter_by(id=product_id).scalar()
+    stmt = (
+        db.update(Product)
+        .where(Product.id == product_id)
+        .values(quantity=quantity)
+    )
+    if db.session.execute(stmt).rowcount != 1:
+        raise ProductNotFound(product_id)
+    track_quantities({product_id: previous or 0})
+    return quantity
+
+def lock_products(product_ids):
+    rows = (
+        db.session.query(Product.id, Product.name, Product.quantity, Product.reserved_quantity)
+        .filter(Product.id.in_(list(product_ids)))
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    )
+    return {row.id: row for row in rows}
+
+def _execute_tracked(stmt, deltas):
+    if _returning_supported():
+        rows = db.session.execute(stmt.returning(Product.id, Product.quantity)).all()
+    else:
+        db.session.execute(stmt)
+        rows = db.session.query(Product.id, Product.quantity).filter(Product.id.in_(list(deltas))).all()
+    track_quantities({product_id: quantity - deltas[product_id] for product_id, quantity in rows})
+
+def update_quantities(deltas):
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    _execute_tracked(
+        db.update(Product)
+        .where(Product.id.in_(deltas))
+        .values(quantity=Product.quantity + db.case(deltas, value=Product.id, else_=0)),
+        deltas
+    )
+
+def _released(totals):
+    amount = db.case(totals, value=Product.id, else_=0)
+    return db.case((Product.reserved_quantity >= amount, Product.reserved_quantity - amount), else_=0)
+
+def reserve(product_id, quantity):
+    if quantity <= 0:
+        raise ValueError('quantidade deve ser positiva')
+    stmt = (
+        db.update(Product)
+        .where(Product.id == product_id, Product.quantity - Product.reserved_quantity >= quantity)
+        .values(reserved_quantity=Product.reserved_quantity + quantity)
+    )
+    if db.session.execute(stmt).rowcount != 1:
+        name, available = _available_row(product_id)
+        raise InsufficientStock([(product_id, name, available, quantity)])
+    track_products([product_id])
+
+def reserve_quantities(totals):
+    totals = {product_id: quantity for product_id, quantity in totals.items() if quantity}
+    if not totals:
+        return
+    if any(quantity < 0 for quantity in totals.values()):
+        raise ValueError('quantidade deve ser positiva')
+    amount = db.case(totals, value=Product.id, else_=0)
+    stmt = (
+        db.update(Product)
+        .where(Product.id.in_(totals), Product.quantity - Product.reserved_quantity >= amount)
+        .values(reserved_quantity=Product.reserved_quantity + amount)
+    )
+    if db.session.execute(stmt).rowcount != len(totals):
+        found = lock_products(totals)
+        raise InsufficientStock([
+            (row.id, row.name, row.quantity - row.reserved_quantity, totals[row.id])
+            for row in found.values()
+            if row.quantity - row.reserved_quantity < totals[row.id]
+        ])
+    track_products(totals)
+
+def release_reserved(totals):
+    totals = {product_id: quantity for product_id, quantity in totals.items() if quantity}
+    if not totals:
+        return
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(totals))
+        .values(reserved_quantity=_released(totals))
+    )
+    track_products(totals)
+
+def consume_reserved(totals):
+    totals = {product_id: quantity for product_id, quantity in totals.items() if quantity}
+    if not totals:
+        return
+    _execute_tracked(
+        db.update(Product)
+        .where(Product.id.in_(totals))
+        .values(
+            quantity=Product.quantity - db.case(totals, value=Product.id, else_=0),
+            reserved_quantity=_released(totals)
+        ),
+        {product_id: -quantity for product_id, quantity in totals.items()}
+    )
+
+def ship_reserved(totals):
+    totals = {product_id: quantity for product_id, quantity in totals.items() if quantity}
+    if not totals:
+        return
+    
+    found = lock_products(totals)
+    missing = set(totals) - set(found)
+    if missing:
+        raise ProductNotFound(min(missing))
+    
+    shortages = [
+        (row.id, row.name, row.quantity, totals[row.id])
+        for row in found.values()
+        if row.quantity < totals[row.id]
+    ]
+    if shortages:
+        raise InsufficientStock(shortages)
+    
+    consume_reserved(totals)
+
+def rebuild_reservations():
+    reserved = (
+        db.select(db.func.coalesce(db.func.sum(ShipmentItem.quantity), 0))
+        .join(Shipment, Shipment.id == ShipmentItem.shipment_id)
+        .where(ShipmentItem.product_id == Product.id, Shipment.shipped_at.is_(None))
+        .scalar_subquery()
+    )
+    result = db.session.execute(db.update(Product).values(reserved_quantity=reserved))
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,189 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+CLEANUP_INTERVAL = 60
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_pid = None
+_last_cleanup = 0.0
+_active = {}
+
+class JobQueueFull(Exception):
+    pass
+
+def init_app(app):
+    app.config.setdefault('REPORT_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'wms_reports'))
+    app.config.setdefault('REPORT_JOB_WORKERS', 2)
+    app.config.setdefault('REPORT_JOB_MAX_PENDING', 10)
+    app.config.setdefault('REPORT_JOB_RETENTION', 3600)
+    app.config.setdefault('REPORT_JOB_HEARTBEAT', 15)
+    app.config.setdefault('REPORT_JOB_STALE_AFTER', 120)
+    os.makedirs(app.config['REPORT_JOBS_DIR'], exist_ok=True)
+
+def _get_executor(app):
+    global _executor, _slots, _pid
+    with _lock:
+        if _executor is None or _pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['REPORT_JOB_WORKERS'],
+                thread_name_prefix='wms-report'
+            )
+            _slots = threading.BoundedSemaphore(app.config['REPORT_JOB_MAX_PENDING'])
+            _active.clear()
+            _pid = os.getpid()
+            threading.Thread(target=_heartbeat, args=(app,), name='wms-report-heartbeat', daemon=True).start()
+        return _executor, _slots
+
+def _heartbeat(app):
+    pid = os.getpid()
+    while _pid == pid:
+        time.sleep(app.config['REPORT_JOB_HEARTBEAT'])
+        with _lock:
+            try:
+                now = time.time()
+                for job in _active.values():
+                    job['heartbeat_at'] = now
+                    _save(job, app)
+            except Exception:
+                app.logger.exception('Falha ao atualizar relatórios em andamento')
+
+def _status_path(job_id, app=None):
+    app = app or current_app
+    return os.path.join(app.config['REPORT_JOBS_DIR'], f'{job_id}.json')
+
+def output_path(job, app=None):
+    app = app or current_app
+    return os.path.join(app.config['REPORT_JOBS_DIR'], f'{job["id"]}.{job["extension"]}')
+
+def _save(job, app):
+    path = _status_path(job['id'], app)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(job, f)
+    os.replace(temporary, path)
+
+def _saved_status(job, app):
+    try:
+        with open(_status_path(job['id'], app)) as f:
+            return json.load(f)['status']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _fail_if_stale(job, app, now):
+    if job['status'] not in ('queued', 'running') or job['id'] in _active:
+        return job
+    if now - job.get('heartbeat_at', job['created_at']) > app.config['REPORT_JOB_STALE_AFTER']:
+        job['status'] = 'failed'
+        job['error'] = 'O processo que gerava o relatório parou de responder.'
+        job['finished_at'] = now
+        _save(job, app)
+    return job
+
+def get_job(job_id):
+    if not JOB_ID_PATTERN.fullmatch(job_id):
+        return None
+    try:
+        with open(_status_path(job_id)) as f:
+            job = json.load(f)
+        return _fail_if_stale(job, current_app, time.time())
+    except (OSError, ValueError, KeyError):
+        return None
+
+def submit(kind, builder, params, user_id, download_name, mimetype):
+    app = current_app._get_current_object()
+    cleanup_expired(app)
+    executor, slots = _get_executor(app)
+    
+    if not slots.acquire(blocking=False):
+        raise JobQueueFull()
+    
+    job = {
+        'id': uuid.uuid4().hex,
+        'kind': kind,
+        'extension': download_name.rsplit('.', 1)[-1],
+        'download_name': download_name,
+        'mimetype': mimetype,
+        'user_id': user_id,
+        'status': 'queued',
+        'error': None,
+        'created_at': time.time(),
+        'started_at': None,
+        'heartbeat_at': time.time(),
+        'finished_at': None
+    }
+    try:
+        with _lock:
+            _save(job, app)
+            _active[job['id']] = job
+        executor.submit(_run, app, slots, job, builder, params)
+    except Exception:
+        with _lock:
+            _active.pop(job['id'], None)
+        slots.release()
+        raise
+    return job
+
+def _run(app, slots, job, builder, params):
+    path = output_path(job, app)
+    try:
+        with _lock:
+            job['status'] = 'running'
+            job['started_at'] = job['heartbeat_at'] = time.time()
+            _save(job, app)
+        
+        with app.app_context():
+            with open(path + '.part', 'wb') as output:
+                builder(output, params)
+        os.replace(path + '.part', path)
+        
+        job['status'] = 'done'
+    except Exception as e:
+        app.logger.exception('Falha ao gerar relatório %s', job['id'])
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        if os.path.exists(path + '.part'):
+            os.remove(path + '.part')
+    finally:
+        with _lock:
+            _active.pop(job['id'], None)
+            job['finished_at'] = time.time()
+            if _saved_status(job, app) == 'failed' and job['status'] == 'done':
+                os.remove(path)
+            else:
+                _save(job, app)
+        slots.release()
+
+def cleanup_expired(app):
+    global _last_cleanup
+    now = time.time()
+    if now - _last_cleanup < CLEANUP_INTERVAL:
+        return
+    _last_cleanup = now
+    
+    directory = app.config['REPORT_JOBS_DIR']
+    cutoff = now - app.config['REPORT_JOB_RETENTION']
+    for name in os.listdir(directory):
+        job_id = name.split('.', 1)[0]
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if name.endswith('.json'):
+                with open(path) as f:
+                    if _fail_if_stale(json.load(f), app, now)['status'] in ('queued', 'running'):
+                        continue
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            os.remove(path)
+        except (OSError, ValueError, KeyError):
+            continue
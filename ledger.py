@@ -0,0 +1,229 @@
+from datetime import datetime
+from models import db, User, Product, Movement, StockSnapshot
+from inventory import apply_delta, update_quantities
+from rollup import record_movement, record_batch
+from events import queue_event
+
+LEDGER_BATCH_SIZE = 500
+OPENING_BALANCE_NOTE = 'Saldo inicial'
+
+class LedgerError(Exception):
+    pass
+
+def apply_movement(quantity, movement_type, amount):
+    if movement_type == 'entrada':
+        return quantity + amount
+    if movement_type == 'saida':
+        return quantity - amount
+    if movement_type == 'ajuste':
+        return amount
+    raise LedgerError(f'Tipo de movimentação desconhecido: {movement_type}')
+
+def _latest_snapshots(product_ids, at=None, before_movement_id=None):
+    latest = (
+        db.session.query(StockSnapshot.product_id, db.func.max(StockSnapshot.movement_id).label('movement_id'))
+        .filter(StockSnapshot.product_id.in_(product_ids))
+    )
+    if at is not None:
+        latest = latest.filter(StockSnapshot.as_of <= at)
+    if before_movement_id is not None:
+        latest = latest.filter(StockSnapshot.movement_id < before_movement_id)
+    latest = latest.group_by(StockSnapshot.product_id).subquery()
+    
+    rows = (
+        db.session.query(StockSnapshot.product_id, StockSnapshot.movement_id, StockSnapshot.quantity)
+        .join(latest, db.and_(
+            latest.c.product_id == StockSnapshot.product_id,
+            latest.c.movement_id == StockSnapshot.movement_id
+        ))
+        .all()
+    )
+    return {row.product_id: row for row in rows}
+
+def _replay_query(starts, at=None, before_movement_id=None):
+    query = (
+        db.session.query(Movement.id, Movement.product_id, Movement.type, Movement.quantity, Movement.created_at)
+        .filter(db.or_(*[
+            db.and_(Movement.product_id == product_id, Movement.id > start)
+            for product_id, start in starts.items()
+        ]))
+    )
+    if at is not None:
+        query = query.filter(Movement.created_at <= at)
+    if before_movement_id is not None:
+        query = query.filter(Movement.id < before_movement_id)
+    return query.order_by(Movement.product_id, Movement.id)
+
+def replay(product_ids, at=None, before_movement_id=None):
+    product_ids = list(product_ids)
+    snapshots = _latest_snapshots(product_ids, at, before_movement_id)
+    state = {
+        product_id: {
+            'quantity': snapshots[product_id].quantity if product_id in snapshots else 0,
+            'movement_id': snapshots[product_id].movement_id if product_id in snapshots else None,
+            'as_of': None,
+            'replayed': 0
+        }
+        for product_id in product_ids
+    }
+    if not state:
+        return state
+    
+    query = _replay_query(
+        {product_id: entry['movement_id'] or 0 for product_id, entry in state.items()},
+        at,
+        before_movement_id
+    )
+    for movement_id, product_id, movement_type, quantity, created_at in query.yield_per(1000):
+        entry = state[product_id]
+        entry['quantity'] = apply_movement(entry['quantity'], movement_type, quantity)
+        entry['movement_id'] = movement_id
+        entry['as_of'] = created_at
+        entry['replayed'] += 1
+    return state
+
+def stock_at(product_id, at=None):
+    return replay([product_id], at=at)[product_id]['quantity']
+
+def _product_batches(batch_size):
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(Product.id, Product.code, Product.quantity)
+            .filter(Product.id > last_id)
+            .order_by(Product.id)
+            .limit(batch_size)
+            .with_for_update()
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+def take_snapshots(min_movements=1, batch_size=LEDGER_BATCH_SIZE):
+    created = 0
+    now = datetime.utcnow()
+    for rows in _product_batches(batch_size):
+        state = replay(row.id for row in rows)
+        snapshots = [
+            {
+                'product_id': product_id,
+                'movement_id': entry['movement_id'],
+                'quantity': entry['quantity'],
+                'as_of': entry['as_of'],
+                'created_at': now
+            }
+            for product_id, entry in state.items()
+            if entry['movement_id'] is not None and entry['replayed'] >= min_movements
+        ]
+        if snapshots:
+            db.session.execute(db.insert(StockSnapshot), snapshots)
+            created += len(snapshots)
+        db.session.commit()
+    return created
+
+def reconcile(fix=False, batch_size=LEDGER_BATCH_SIZE):
+    drift = []
+    for rows in _product_batches(batch_size):
+        state = replay(row.id for row in rows)
+        mismatched = [
+            (row.id, row.code, row.quantity or 0, state[row.id]['quantity'])
+            for row in rows
+            if (row.quantity or 0) != state[row.id]['quantity']
+        ]
+        if fix:
+            update_quantities({
+                product_id: expected - quantity
+                for product_id, code, quantity, expected in mismatched
+            })
+        db.session.commit()
+        drift.extend(mismatched)
+    return drift
+
+def open_balances(user_id, codes=None, only_unrecorded=True, notes=OPENING_BALANCE_NOTE):
+    query = db.session.query(Product.id, Product.category, Product.quantity)
+    if codes is not None:
+        query = query.filter(Product.code.in_(list(codes)))
+    if only_unrecorded:
+        query = query.filter(Product.quantity != 0, ~db.exists().where(Movement.product_id == Product.id))
+    
+    products = query.all()
+    if not products:
+        return 0
+    
+    now = datetime.utcnow()
+    db.session.execute(db.insert(Movement), [{
+        'product_id': product_id,
+        'type': 'ajuste',
+        'quantity': quantity or 0,
+        'user_id': user_id,
+        'notes': notes,
+        'created_at': now
+    } for product_id, category, quantity in products])
+    record_batch((product_id, category, now, 'ajuste', quantity or 0) for product_id, category, quantity in products)
+    queue_event('movement_batch', {'count': len(products)})
+    return len(products)
+
+def default_user_id():
+    admin = db.session.query(db.func.min(User.id)).filter(User.role == 'admin').scalar()
+    return admin or db.session.query(db.func.min(User.id)).scalar()
+
+def record_shipments(shipments, user_id):
+    rows = [
+        {
+            'product_id': product_id,
+            'type': 'saida',
+            'quantity': quantity,
+            'user_id': user_id,
+            'notes': f'Expedição {order_number}',
+            'created_at': datetime.utcnow()
+        }
+        for order_number, totals in shipments
+        for product_id, quantity in totals.items()
+        if quantity
+    ]
+    if not rows:
+        return
+    
+    categories = dict(
+        db.session.query(Product.id, Product.category)
+        .filter(Product.id.in_({row['product_id'] for row in rows}))
+        .all()
+    )
+    db.session.execute(db.insert(Movement), rows)
+    record_batch(
+        (row['product_id'], categories[row['product_id']], row['created_at'], 'saida', row['quantity'])
+        for row in rows
+    )
+    queue_event('movement_batch', {'count': len(rows)})
+
+def reverse(movement, user_id):
+    if movement.reverses_id:
+        raise LedgerError('Um estorno não pode ser estornado.')
+    if db.session.query(Movement.id).filter_by(reverses_id=movement.id).first():
+        raise LedgerError('Esta movimentação já foi estornada.')
+    
+    if movement.type == 'entrada':
+        delta = -movement.quantity
+    elif movement.type == 'saida':
+        delta = movement.quantity
+    else:
+        previous = replay([movement.product_id], before_movement_id=movement.id)[movement.product_id]['quantity']
+        delta = previous - movement.quantity
+    if not delta:
+        raise LedgerError('A movimentação não alterou o estoque; não há o que estornar.')
+    
+    apply_delta(movement.product_id, delta)
+    reversal = Movement(
+        product_id=movement.product_id,
+        type='entrada' if delta > 0 else 'saida',
+        quantity=abs(delta),
+        user_id=user_id,
+        notes=f'Estorno da movimentação #{movement.id}',
+        reverses_id=movement.id
+    )
+    db.session.add(reversal)
+    db.session.flush()
+    record_movement(reversal, movement.product)
+    return reversal
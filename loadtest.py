@@ -0,0 +1,112 @@
+import argparse
+import http.cookiejar
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import Counter
+
+DEFAULT_PATHS = ('/dashboard', '/stock/', '/shipping/', '/movements/', '/reports/api/summary')
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+def _login(base_url, username, password):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode('utf-8')
+    opener.open(f'{base_url}/login', data=data, timeout=30).read()
+    return opener
+
+def _open_streams(base_url, username, password, count, stop):
+    def hold():
+        opener = _login(base_url, username, password)
+        try:
+            with opener.open(f'{base_url}/events/stream', timeout=5) as response:
+                while not stop.is_set():
+                    try:
+                        response.readline()
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    
+    threads = [threading.Thread(target=hold, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+def run(base_url, username, password, paths, concurrency, duration, streams=0):
+    stop = threading.Event()
+    _open_streams(base_url, username, password, streams, stop)
+    time.sleep(1 if streams else 0)
+    
+    latencies = []
+    errors = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    
+    def worker(offset):
+        try:
+            opener = _login(base_url, username, password)
+        except OSError as e:
+            with lock:
+                errors[f'/login: {e.__class__.__name__}'] += 1
+            return
+        local = []
+        index = offset
+        while time.monotonic() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                with opener.open(base_url + path, timeout=30) as response:
+                    response.read()
+                local.append((time.perf_counter() - start) * 1000)
+            except OSError as e:
+                with lock:
+                    errors[f'{path}: {getattr(e, "code", None) or e.__class__.__name__}'] += 1
+        with lock:
+            latencies.extend(local)
+    
+    started = time.monotonic()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - started
+    stop.set()
+    
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': _percentile(latencies, 50),
+        'p95': _percentile(latencies, 95),
+        'p99': _percentile(latencies, 99),
+        'errors': dict(errors),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga simples do WMS.')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--streams', type=int, default=0, help='conexões SSE abertas durante o teste')
+    parser.add_argument('--path', action='append', dest='paths')
+    args = parser.parse_args()
+    
+    result = run(args.url.rstrip('/'), args.username, args.password, args.paths or DEFAULT_PATHS,
+                 args.concurrency, args.duration, args.streams)
+    print(f"{result['requests']} requisições, {result['rps']:.1f} req/s")
+    print(f"latência p50={result['p50']:.1f} ms p95={result['p95']:.1f} ms p99={result['p99']:.1f} ms")
+    for error, count in sorted(result['errors'].items()):
+        print(f'erro {error}: {count}')
+
+if __name__ == '__main__':
+    main()
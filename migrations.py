@@ -0,0 +1,227 @@
+from contextlib import contextmanager
+from datetime import datetime
+from models import db
+from inventory import rebuild_reservations
+from rollup import rebuild_rollup
+from search import build_search_index
+from ledger import open_balances, take_snapshots, default_user_id
+
+MIGRATION_LOCK_ID = 7301
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('name', db.String(100), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False)
+)
+
+frozen = db.MetaData()
+
+baseline_tables = (
+    db.Table(
+        'users', frozen,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('username', db.String(80), unique=True, nullable=False),
+        db.Column('email', db.String(120), unique=True, nullable=False),
+        db.Column('password_hash', db.String(255), nullable=False),
+        db.Column('name', db.String(100), nullable=False),
+        db.Column('role', db.String(50), nullable=False),
+        db.Column('created_at', db.DateTime),
+        db.Column('active', db.Boolean)
+    ),
+    db.Table(
+        'products', frozen,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('code', db.String(50), unique=True, nullable=False),
+        db.Column('name', db.String(200), nullable=False),
+        db.Column('description', db.Text),
+        db.Column('category', db.String(100), nullable=False),
+        db.Column('unit', db.String(20), nullable=False),
+        db.Column('quantity', db.Integer),
+        db.Column('min_quantity', db.Integer),
+        db.Column('location', db.String(100)),
+        db.Column('created_at', db.DateTime),
+        db.Column('updated_at', db.DateTime)
+    ),
+    db.Table(
+        'movements', frozen,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('product_id', db.Integer, db.ForeignKey('products.id'), nullable=False),
+        db.Column('type', db.String(20), nullable=False),
+        db.Column('quantity', db.Integer, nullable=False),
+        db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False),
+        db.Column('notes', db.Text),
+        db.Column('created_at', db.DateTime)
+    ),
+    db.Table(
+        'shipments', frozen,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('order_number', db.String(50), unique=True, nullable=False),
+        db.Column('customer_name', db.String(200), nullable=False),
+        db.Column('customer_address', db.Text, nullable=False),
+        db.Column('status', db.String(50), nullable=False),
+        db.Column('created_at', db.DateTime),
+        db.Column('shipped_at', db.DateTime),
+        db.Column('user_id', db.Integer, db.ForeignKey('users.id'), nullable=False),
+        db.Column('notes', db.Text)
+    ),
+    db.Table(
+        'shipment_items', frozen,
+        db.Column('id', db.Integer, primary_key=True),
+        db.Column('shipment_id', db.Integer, db.ForeignKey('shipments.id'), nullable=False),
+        db.Column('product_id', db.Integer, db.ForeignKey('products.id'), nullable=False),
+        db.Column('quantity', db.Integer, nullable=False)
+    ),
+)
+
+daily_rollup_table = db.Table(
+    'movement_daily_rollup', frozen,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('product_id', db.Integer, db.ForeignKey('products.id'), nullable=False),
+    db.Column('category', db.String(100), nullable=False),
+    db.Column('day', db.Date, nullable=False),
+    db.Column('type', db.String(20), nullable=False),
+    db.Column('quantity', db.Integer, nullable=False),
+    db.Column('count', db.Integer, nullable=False),
+    db.UniqueConstraint('product_id', 'day', 'type', name='uq_movement_daily_rollup'),
+    db.Index('ix_movement_daily_rollup_day_type', 'day', 'type')
+)
+
+stock_snapshots_table = db.Table(
+    'stock_snapshots', frozen,
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('product_id', db.Integer, db.ForeignKey('products.id'), nullable=False),
+    db.Column('movement_id', db.Integer, db.ForeignKey('movements.id'), nullable=False),
+    db.Column('quantity', db.Integer, nullable=False),
+    db.Column('as_of', db.DateTime, nullable=False),
+    db.Column('created_at', db.DateTime),
+    db.UniqueConstraint('product_id', 'movement_id', name='uq_stock_snapshots_product_movement')
+)
+
+HOT_PATH_INDEX_DDL = (
+    'CREATE INDEX IF NOT EXISTS ix_products_name_id ON products (name, id)',
+    'CREATE INDEX IF NOT EXISTS ix_products_category_name_id ON products (category, name, id)',
+    'CREATE INDEX IF NOT EXISTS ix_products_low_stock_name_id ON products (name, id) WHERE quantity <= min_quantity',
+    'CREATE INDEX IF NOT EXISTS ix_movements_created_at_type ON movements (created_at, type)',
+    'CREATE INDEX IF NOT EXISTS ix_movements_product_id_created_at ON movements (product_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_shipments_created_at ON shipments (created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_shipments_status_created_at ON shipments (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS ix_shipments_open_id ON shipments (id) WHERE shipped_at IS NULL',
+    'CREATE INDEX IF NOT EXISTS ix_shipment_items_shipment_id_product_id ON shipment_items (shipment_id, product_id)',
+    'CREATE INDEX IF NOT EXISTS ix_shipment_items_product_id ON shipment_items (product_id)',
+)
+
+def _connection():
+    return db.session.connection()
+
+def _execute(*statements):
+    for statement in statements:
+        db.session.execute(db.text(statement))
+
+def _create_tables(*tables):
+    frozen.create_all(_connection(), tables=tables)
+
+def _baseline():
+    _create_tables(*baseline_tables)
+
+def _reserved_quantity():
+    columns = {column['name'] for column in db.inspect(_connection()).get_columns('products')}
+    if 'reserved_quantity' not in columns:
+        db.session.execute(db.text('ALTER TABLE products ADD COLUMN reserved_quantity INTEGER NOT NULL DEFAULT 0'))
+        rebuild_reservations()
+
+def _daily_rollup():
+    if not db.inspect(_connection()).has_table(daily_rollup_table.name):
+        _create_tables(daily_rollup_table)
+        rebuild_rollup()
+
+def _hot_path_indexes():
+    _execute(*HOT_PATH_INDEX_DDL)
+
+def _search_index():
+    build_search_index()
+
+def _movement_ledger():
+    columns = {column['name'] for column in db.inspect(_connection()).get_columns('movements')}
+    if 'reverses_id' not in columns:
+        db.session.execute(db.text('ALTER TABLE movements ADD COLUMN reverses_id INTEGER REFERENCES movements (id)'))
+    _execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_movements_reverses_id ON movements (reverses_id)')
+    _create_tables(stock_snapshots_table)
+    
+    user_id = default_user_id()
+    if user_id is not None:
+        open_balances(user_id, only_unrecorded=False, notes='Saldo de abertura do razão')
+        db.session.commit()
+        take_snapshots()
+
+def _shipment_list_indexes():
+    _execute(
+        'CREATE INDEX IF NOT EXISTS ix_shipments_created_at_id ON shipments (created_at, id)',
+        'CREATE INDEX IF NOT EXISTS ix_shipments_status_created_at_id ON shipments (status, created_at, id)',
+        'DROP INDEX IF EXISTS ix_shipments_created_at',
+        'DROP INDEX IF EXISTS ix_shipments_status_created_at',
+    )
+
+def _ledger_replay_index():
+    _execute('CREATE INDEX IF NOT EXISTS ix_movements_product_id_id ON movements (product_id, id)')
+
+def _product_active():
+    columns = {column['name'] for column in db.inspect(_connection()).get_columns('products')}
+    if 'active' not in columns:
+        db.session.execute(db.text('ALTER TABLE products ADD COLUMN active BOOLEAN NOT NULL DEFAULT TRUE'))
+
+MIGRATIONS = [
+    (1, 'baseline', _baseline),
+    (2, 'products.reserved_quantity', _reserved_quantity),
+    (3, 'movement_daily_rollup', _daily_rollup),
+    (4, 'hot path indexes', _hot_path_indexes),
+    (5, 'product search index', _search_index),
+    (6, 'movement ledger', _movement_ledger),
+    (7, 'shipment list indexes', _shipment_list_indexes),
+    (8, 'ledger replay index', _ledger_replay_index),
+    (9, 'products.active', _product_active),
+]
+
+@contextmanager
+def _migration_lock():
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+    
+    with db.engine.connect() as connection:
+        connection.execute(db.text('SELECT pg_advisory_lock(:id)'), {'id': MIGRATION_LOCK_ID})
+        try:
+            yield
+        finally:
+            connection.execute(db.text('SELECT pg_advisory_unlock(:id)'), {'id': MIGRATION_LOCK_ID})
+
+def applied_versions():
+    if not db.inspect(_connection()).has_table(schema_migrations.name):
+        return {}
+    rows = db.session.execute(db.select(schema_migrations.c.version, schema_migrations.c.applied_at)).all()
+    return dict(rows)
+
+def upgrade(target=None):
+    applied = []
+    with _migration_lock():
+        schema_migrations.create(_connection(), checkfirst=True)
+        db.session.commit()
+        
+        done = applied_versions()
+        for version, name, migrate in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            if version in done:
+                continue
+            
+            try:
+                migrate()
+                db.session.execute(
+                    db.insert(schema_migrations).values(version=version, name=name, applied_at=datetime.utcnow())
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            applied.append((version, name))
+    return applied
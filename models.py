@@ -35,6 +35,15 @@ class User(UserMixin, db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_name_id', 'name', 'id'),
+        db.Index('ix_products_category_name_id', 'category', 'name', 'id'),
+        db.Index(
+            'ix_products_low_stock_name_id', 'name', 'id',
+            postgresql_where=db.text('quantity <= min_quantity'),
+            sqlite_where=db.text('quantity <= min_quantity')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     code = db.Column(db.String(50), unique=True, nullable=False)
@@ -44,15 +53,27 @@ class Product(db.Model):
     unit = db.Column(db.String(20), nullable=False, default='UN')
     quantity = db.Column(db.Integer, default=0)
     min_quantity = db.Column(db.Integer, default=10)
+    reserved_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    active = db.Column(db.Boolean, nullable=False, default=True, server_default=db.true())
     location = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @property
+    def available_quantity(self):
+        return (self.quantity or 0) - (self.reserved_quantity or 0)
+    
     def __repr__(self):
         return f'<Product {self.code} - {self.name}>'
 
 class Movement(db.Model):
     __tablename__ = 'movements'
+    __table_args__ = (
+        db.Index('ix_movements_created_at_type', 'created_at', 'type'),
+        db.Index('ix_movements_product_id_created_at', 'product_id', 'created_at'),
+        db.Index('ix_movements_product_id_id', 'product_id', 'id'),
+        db.Index('ux_movements_reverses_id', 'reverses_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -60,6 +81,7 @@ class Movement(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     notes = db.Column(db.Text)
+    reverses_id = db.Column(db.Integer, db.ForeignKey('movements.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     product = db.relationship('Product', backref='movements')
@@ -70,6 +92,15 @@ class Movement(db.Model):
 
 class Shipment(db.Model):
     __tablename__ = 'shipments'
+    __table_args__ = (
+        db.Index('ix_shipments_created_at_id', 'created_at', 'id'),
+        db.Index('ix_shipments_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index(
+            'ix_shipments_open_id', 'id',
+            postgresql_where=db.text('shipped_at IS NULL'),
+            sqlite_where=db.text('shipped_at IS NULL')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -88,6 +119,10 @@ class Shipment(db.Model):
 
 class ShipmentItem(db.Model):
     __tablename__ = 'shipment_items'
+    __table_args__ = (
+        db.Index('ix_shipment_items_shipment_id_product_id', 'shipment_id', 'product_id'),
+        db.Index('ix_shipment_items_product_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     shipment_id = db.Column(db.Integer, db.ForeignKey('shipments.id'), nullable=False)
@@ -99,3 +134,37 @@ class ShipmentItem(db.Model):
     
     def __repr__(self):
         return f'<ShipmentItem {self.product_id} - {self.quantity}>'
+
+class MovementDailyRollup(db.Model):
+    __tablename__ = 'movement_daily_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'day', 'type', name='uq_movement_daily_rollup'),
+        db.Index('ix_movement_daily_rollup_day_type', 'day', 'type'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    type = db.Column(db.String(20), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<MovementDailyRollup {self.day} {self.type} - {self.quantity}>'
+
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    __table_args__ = (
+        db.UniqueConstraint('product_id', 'movement_id', name='uq_stock_snapshots_product_movement'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    movement_id = db.Column(db.Integer, db.ForeignKey('movements.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    as_of = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StockSnapshot {self.product_id} @ {self.movement_id} - {self.quantity}>'
@@ -0,0 +1,77 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':'), default=_json_default).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    return values
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is int:
+        return int(value)
+    return value
+
+def coerce_cursor(columns, values):
+    if values is None:
+        return None
+    try:
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError, NotImplementedError):
+        return None
+
+def keyset_filter(columns, values, descending=False):
+    row, cursor = db.tuple_(*columns), db.tuple_(*values)
+    return row < cursor if descending else row > cursor
+
+def keyset_page(query, columns, cursor=None, page_size=DEFAULT_PAGE_SIZE, descending=False, key=None):
+    values = coerce_cursor(columns, decode_cursor(cursor, len(columns)))
+    if values is not None:
+        query = query.filter(keyset_filter(columns, values, descending))
+    
+    order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(page_size + 1).all()
+    
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_next and rows:
+        key = key or (lambda row: [getattr(row, c.key) for c in columns])
+        next_cursor = encode_cursor(key(rows[-1]))
+    
+    return rows, next_cursor
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, Product, Movement, MovementDailyRollup
+
+CHART_PERIODS = (7, 30, 90)
+
+def _upsert(rows):
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    table = MovementDailyRollup.__table__
+    
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['product_id', 'day', 'type'],
+            set_={
+                'quantity': table.c.quantity + stmt.excluded.quantity,
+                'count': table.c.count + stmt.excluded.count
+            }
+        )
+        db.session.execute(stmt, rows)
+        return
+    
+    for values in rows:
+        quantity = values.pop('quantity')
+        count = values.pop('count')
+        row = MovementDailyRollup.query.filter_by(**values).with_for_update().first()
+        if row is None:
+            db.session.add(MovementDailyRollup(**values, quantity=quantity, count=count))
+        else:
+            row.quantity += quantity
+            row.count += count
+
+def record_movement(movement, product):
+    created_at = movement.created_at or datetime.utcnow()
+    _upsert([{
+        'product_id': product.id,
+        'category': product.category,
+        'day': created_at.date(),
+        'type': movement.type,
+        'quantity': movement.quantity,
+        'count': 1
+    }])
+
+def record_batch(entries):
+    totals = {}
+    for product_id, category, created_at, movement_type, quantity in entries:
+        key = (product_id, category, created_at.date(), movement_type)
+        total = totals.setdefault(key, [0, 0])
+        total[0] += quantity
+        total[1] += 1
+    
+    _upsert([
+        {
+            'product_id': product_id,
+            'category': category,
+            'day': day,
+            'type': movement_type,
+            'quantity': quantity,
+            'count': count
+        }
+        for (product_id, category, day, movement_type), (quantity, count) in totals.items()
+    ])
+
+def rebuild_rollup():
+    day = db.func.date(Movement.created_at)
+    source = (
+        db.select(
+            Movement.product_id,
+            Product.category,
+            day,
+            Movement.type,
+            db.func.sum(Movement.quantity),
+            db.func.count(Movement.id)
+        )
+        .join(Product, Product.id == Movement.product_id)
+        .group_by(Movement.product_id, Product.category, day, Movement.type)
+    )
+    
+    db.session.execute(db.delete(MovementDailyRollup))
+    db.session.execute(
+        db.insert(MovementDailyRollup).from_select(
+            ['product_id', 'category', 'day', 'type', 'quantity', 'count'],
+            source
+        )
+    )
+    db.session.commit()
+    return db.session.query(db.func.count(MovementDailyRollup.id)).scalar()
+
+def movement_series(days=7):
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    
+    rows = (
+        db.session.query(
+            MovementDailyRollup.day,
+            MovementDailyRollup.type,
+            db.func.sum(MovementDailyRollup.quantity)
+        )
+        .filter(
+            MovementDailyRollup.day >= start,
+            MovementDailyRollup.type.in_(('entrada', 'saida'))
+        )
+        .group_by(MovementDailyRollup.day, MovementDailyRollup.type)
+        .all()
+    )
+    totals = {(day, movement_type): quantity or 0 for day, movement_type, quantity in rows}
+    
+    labels, entries, exits = [], [], []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        labels.append(day.strftime('%d/%m'))
+        entries.append(totals.get((day, 'entrada'), 0))
+        exits.append(totals.get((day, 'saida'), 0))
+    
+    return {
+        'labels': labels,
+        'entries': entries,
+        'exits': exits
+    }
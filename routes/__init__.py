@@ -6,5 +6,6 @@ reports_bp = Blueprint('reports', __name__, url_prefix='/reports')
 stock_bp = Blueprint('stock', __name__, url_prefix='/stock')
 movements_bp = Blueprint('movements', __name__, url_prefix='/movements')
 shipping_bp = Blueprint('shipping', __name__, url_prefix='/shipping')
+events_bp = Blueprint('events', __name__, url_prefix='/events')
 
-from routes import auth, admin, reports, stock, movements, shipping
+from routes import auth, admin, reports, stock, movements, shipping, events
@@ -1,8 +1,11 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify
+from flask import render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from functools import wraps
 from routes import admin_bp
 from models import db, User
+from instrumentation import metrics_snapshot, reset_metrics, histogram_labels, FLUSH_INTERVAL
+from identity import invalidate_user
+from stats import invalidate
 
 def admin_required(f):
     @wraps(f)
@@ -49,6 +52,7 @@ def add_user():
         
         db.session.add(new_user)
         db.session.commit()
+        invalidate('users')
         
         flash(f'Usuário {username} criado com sucesso!', 'success')
     except Exception as e:
@@ -75,6 +79,8 @@ def edit_user(user_id):
                 user.set_password(new_password)
             
             db.session.commit()
+            invalidate_user(user.id)
+            invalidate('users')
             flash(f'Usuário {user.username} atualizado com sucesso!', 'success')
             return redirect(url_for('admin.index'))
         except Exception as e:
@@ -97,6 +103,8 @@ def delete_user(user_id):
         username = user.username
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(user_id)
+        invalidate('users')
         
         flash(f'Usuário {username} excluído com sucesso!', 'success')
     except Exception as e:
@@ -111,11 +119,36 @@ def delete_user(user_id):
 def toggle_status(user_id):
     try:
         user = User.query.get_or_404(user_id)
-        user.is_active = not user.is_active
+        user.active = not user.active
         db.session.commit()
+        invalidate_user(user.id)
+        invalidate('users')
         
         status = 'ativado' if user.is_active else 'desativado'
         return jsonify({'success': True, 'message': f'Usuário {status} com sucesso!'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 400
+
+
+@admin_bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    endpoints, workers = metrics_snapshot(current_app)
+    return render_template(
+        'metrics.html',
+        endpoints=endpoints,
+        workers=workers,
+        flush_interval=FLUSH_INTERVAL,
+        histogram_labels=histogram_labels(),
+        enabled=current_app.config['INSTRUMENTATION_ENABLED']
+    )
+
+@admin_bp.route('/metrics/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_metrics_view():
+    reset_metrics(current_app)
+    flash('Métricas reiniciadas.', 'success')
+    return redirect(url_for('admin.metrics'))
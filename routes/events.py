@@ -0,0 +1,42 @@
+import queue
+import random
+import time
+from flask import Response, current_app, request
+from flask_login import login_required
+from routes import events_bp
+from events import subscribe, unsubscribe, stream_enabled
+
+@events_bp.route('/stream')
+@login_required
+def stream():
+    if not stream_enabled(current_app, request.environ):
+        return Response(status=204)
+    
+    subscriber = subscribe(current_app._get_current_object())
+    if subscriber is None:
+        retry = current_app.config['EVENTS_FULL_RETRY']
+        response = Response(f'retry: {random.randint(retry, retry * 2) * 1000}\n\n', mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    heartbeat = current_app.config['EVENTS_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['EVENTS_STREAM_TIMEOUT']
+    
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    if subscriber.dropped:
+                        yield 'event: refresh\ndata: {"scope": "all"}\n\n'
+                        return
+                    yield ': keepalive\n\n'
+        finally:
+            unsubscribe(subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
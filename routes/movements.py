@@ -1,39 +1,33 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from routes import movements_bp
 from models import db, Product, Movement
-from datetime import datetime, timedelta
+from stats import movement_stats, invalidate
+from rollup import record_movement
+from instrumentation import query_budget
+from inventory import apply_delta, set_quantity, InsufficientStock
+from ingest import read_records, ingest_movements, validate_movement, BatchTooLarge
+from events import queue_event, queue_movement
+from ledger import reverse, LedgerError
 
 @movements_bp.route('/')
 @login_required
+@query_budget(6)
 def index():
-    movements = Movement.query.order_by(Movement.created_at.desc()).limit(100).all()
-    products = Product.query.order_by(Product.name).all()
+    movements = (
+        Movement.query
+        .options(db.joinedload(Movement.product), db.joinedload(Movement.user))
+        .order_by(Movement.created_at.desc())
+        .limit(100)
+        .all()
+    )
+    reversed_ids = {
+        reverses_id for reverses_id, in
+        db.session.query(Movement.reverses_id)
+        .filter(Movement.reverses_id.in_([movement.id for movement in movements]))
+    } if movements else set()
     
-    today = datetime.now().date()
-    entries_today = Movement.query.filter(
-        Movement.type == 'entrada',
-        db.func.date(Movement.created_at) == today
-    ).count()
-    
-    exits_today = Movement.query.filter(
-        Movement.type == 'saida',
-        db.func.date(Movement.created_at) == today
-    ).count()
-    
-    adjustments_today = Movement.query.filter(
-        Movement.type == 'ajuste',
-        db.func.date(Movement.created_at) == today
-    ).count()
-    
-    stats = {
-        'entries_today': entries_today,
-        'exits_today': exits_today,
-        'adjustments_today': adjustments_today,
-        'total_movements': Movement.query.count()
-    }
-    
-    return render_template('movements.html', movements=movements, products=products, stats=stats)
+    return render_template('movements.html', movements=movements, reversed_ids=reversed_ids, stats=movement_stats())
 
 @movements_bp.route('/add', methods=['POST'])
 @login_required
@@ -44,17 +38,28 @@ def add_movement():
         quantity = int(request.form.get('quantity'))
         notes = request.form.get('notes', '')
         
+        try:
+            validate_movement(movement_type, quantity)
+        except ValueError as e:
+            flash(f'Movimentação inválida: {e}.', 'danger')
+            return redirect(url_for('movements.index'))
+        
         product = Product.query.get_or_404(product_id)
+        if not product.active:
+            flash('Produto desativado não aceita movimentações.', 'danger')
+            return redirect(url_for('movements.index'))
         
         if movement_type == 'entrada':
-            product.quantity += quantity
+            apply_delta(product_id, quantity)
         elif movement_type == 'saida':
-            if product.quantity < quantity:
+            try:
+                apply_delta(product_id, -quantity)
+            except InsufficientStock:
+                db.session.rollback()
                 flash('Quantidade insuficiente em estoque!', 'danger')
                 return redirect(url_for('movements.index'))
-            product.quantity -= quantity
-        elif movement_type == 'ajuste':
-            product.quantity = quantity
+        else:
+            set_quantity(product_id, quantity)
         
         movement = Movement(
             product_id=product_id,
@@ -65,7 +70,11 @@ def add_movement():
         )
         
         db.session.add(movement)
+        db.session.flush()
+        record_movement(movement, product)
+        queue_movement(movement, product, current_user.name)
         db.session.commit()
+        invalidate('stock', 'movements', 'categories')
         
         flash(f'Movimentação registrada com sucesso!', 'success')
     except Exception as e:
@@ -74,24 +83,50 @@ def add_movement():
     
     return redirect(url_for('movements.index'))
 
-@movements_bp.route('/delete/<int:movement_id>', methods=['POST'])
+@movements_bp.route('/batch', methods=['POST'])
 @login_required
-def delete_movement(movement_id):
+def batch_movements():
+    all_or_nothing = request.args.get('all_or_nothing') == '1'
+    try:
+        inserted, errors = ingest_movements(read_records(request), current_user.id)
+    except BatchTooLarge as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Erro ao importar movimentações: {str(e)}'}), 500
+    
+    if errors and all_or_nothing:
+        db.session.rollback()
+        return jsonify({'success': False, 'inserted': 0, 'errors': errors}), 422
+    
+    if inserted:
+        queue_event('movement_batch', {'count': inserted})
+    db.session.commit()
+    if inserted:
+        invalidate('stock', 'movements', 'categories')
+    
+    return jsonify({'success': not errors, 'inserted': inserted, 'errors': errors})
+
+@movements_bp.route('/reverse/<int:movement_id>', methods=['POST'])
+@login_required
+def reverse_movement(movement_id):
     try:
         movement = Movement.query.get_or_404(movement_id)
-        product = movement.product
-        
-        if movement.type == 'entrada':
-            product.quantity -= movement.quantity
-        elif movement.type == 'saida':
-            product.quantity += movement.quantity
-        
-        db.session.delete(movement)
+        reversal = reverse(movement, current_user.id)
+        queue_movement(reversal, movement.product, current_user.name)
         db.session.commit()
+        invalidate('stock', 'movements', 'categories')
         
-        flash('Movimentação excluída com sucesso!', 'success')
+        flash(f'Movimentação #{movement_id} estornada com sucesso!', 'success')
+    except (LedgerError, InsufficientStock) as e:
+        db.session.rollback()
+        flash(f'Não foi possível estornar a movimentação: {str(e)}', 'danger')
     except Exception as e:
         db.session.rollback()
-        flash(f'Erro ao excluir movimentação: {str(e)}', 'danger')
+        flash(f'Erro ao estornar movimentação: {str(e)}', 'danger')
     
     return redirect(url_for('movements.index'))
@@ -1,19 +1,15 @@
-from flask import render_template, jsonify, Response
-from flask_login import login_required
+from flask import render_template, jsonify, Response, request, make_response, stream_with_context, send_file, url_for, abort
+from flask_login import login_required, current_user
 from routes import reports_bp
-from models import User, Product, Movement
+from models import db, User, Product, Movement
+from rollup import movement_series, CHART_PERIODS
+from stats import user_stats as compute_user_stats, category_stats, data_version
+import jobs
 from datetime import datetime, timedelta
-import random
 import csv
+import hashlib
+import tempfile
 from io import StringIO, BytesIO
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
 
 @reports_bp.route('/')
 @login_required
@@ -23,209 +19,296 @@ def index():
 @reports_bp.route('/api/user_stats')
 @login_required
 def user_stats():
-    total_users = User.query.count()
-    active_users = User.query.filter(User.active.is_(True)).count()
-    inactive_users = total_users - active_users
-    admin_users = User.query.filter_by(role='admin').count()
-    regular_users = User.query.filter_by(role='user').count()
-    
-    return jsonify({
-        'total': total_users,
-        'active': active_users,
-        'inactive': inactive_users,
-        'admins': admin_users,
-        'regular': regular_users
-    })
+    return jsonify(compute_user_stats())
+
+SUMMARY_KEYS = ('users', 'stock', 'movements', 'categories')
+RECENT_ACTIVITIES = 6
+
+def _chart_days():
+    days = request.args.get('days', 7, type=int)
+    return days if days in CHART_PERIODS else 7
+
+def _category_chart():
+    categories = category_stats()
+    return {
+        'labels': [c['category'] for c in categories],
+        'data': [c['units'] for c in categories],
+        'skus': [c['skus'] for c in categories],
+        'low_stock': [c['low_stock'] for c in categories]
+    }
+
+def _recent_activities():
+    rows = (
+        db.session.query(Movement.type, Product.name, Movement.quantity, Movement.created_at)
+        .join(Product, Product.id == Movement.product_id)
+        .order_by(Movement.created_at.desc())
+        .limit(RECENT_ACTIVITIES)
+        .all()
+    )
+    return [{
+        'type': LEDGER_TYPES.get(movement_type, movement_type),
+        'item': name,
+        'quantity': -quantity if movement_type == 'saida' else quantity,
+        'date': created_at.strftime('%Y-%m-%d %H:%M') if created_at else ''
+    } for movement_type, name, quantity, created_at in rows]
+
+def _summary_etag(days):
+    versions = [str(data_version(key)) for key in SUMMARY_KEYS]
+    source = '|'.join([str(days), datetime.utcnow().date().isoformat()] + versions)
+    return hashlib.sha1(source.encode()).hexdigest()
 
 @reports_bp.route('/api/stock_movements')
 @login_required
 def stock_movements():
-    days = 7
-    labels = []
-    entries = []
-    exits = []
-    
-    for i in range(days):
-        date = datetime.now() - timedelta(days=days-i-1)
-        labels.append(date.strftime('%d/%m'))
-        entries.append(random.randint(10, 50))
-        exits.append(random.randint(5, 45))
-    
-    return jsonify({
-        'labels': labels,
-        'entries': entries,
-        'exits': exits
-    })
+    return jsonify(movement_series(_chart_days()))
 
 @reports_bp.route('/api/stock_by_category')
 @login_required
 def stock_by_category():
-    categories = ['Eletrônicos', 'Roupas', 'Alimentos', 'Móveis', 'Ferramentas', 'Outros']
-    quantities = [random.randint(20, 100) for _ in range(len(categories))]
-    
-    return jsonify({
-        'labels': categories,
-        'data': quantities
-    })
+    return jsonify(_category_chart())
 
 @reports_bp.route('/api/recent_activities')
 @login_required
 def recent_activities():
-    activities = [
-        {'type': 'Entrada', 'item': 'Notebook Dell XPS 15', 'quantity': 10, 'date': '2024-11-01 10:30'},
-        {'type': 'Saída', 'item': 'Mouse Logitech MX Master', 'quantity': 5, 'date': '2024-11-01 09:15'},
-        {'type': 'Entrada', 'item': 'Teclado Mecânico RGB', 'quantity': 15, 'date': '2024-10-31 16:45'},
-        {'type': 'Saída', 'item': 'Monitor LG 27"', 'quantity': 3, 'date': '2024-10-31 14:20'},
-        {'type': 'Entrada', 'item': 'Webcam Logitech C920', 'quantity': 8, 'date': '2024-10-31 11:00'},
-        {'type': 'Ajuste', 'item': 'Headset HyperX Cloud', 'quantity': -2, 'date': '2024-10-30 15:30'},
-    ]
+    return jsonify(_recent_activities())
+
+@reports_bp.route('/api/summary')
+@login_required
+def summary():
+    days = _chart_days()
+    etag = _summary_etag(days)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify({
+            'user_stats': compute_user_stats(),
+            'stock_movements': movement_series(days),
+            'stock_by_category': _category_chart(),
+            'recent_activities': _recent_activities()
+        })
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+LEDGER_CHUNK_SIZE = 1000
+LEDGER_TYPES = {'entrada': 'Entrada', 'saida': 'Saída', 'ajuste': 'Ajuste'}
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def _ledger_filters():
+    return {
+        'start': request.args.get('start', type=_parse_date),
+        'end': request.args.get('end', type=_parse_date),
+        'product_id': request.args.get('product_id', type=int),
+        'product': request.args.get('product', '').strip()
+    }
+
+def _ledger_query(filters):
+    query = (
+        db.select(
+            Movement.id,
+            Movement.created_at,
+            Movement.type,
+            Product.code,
+            Product.name,
+            Movement.quantity,
+            User.name,
+            Movement.notes
+        )
+        .join(Product, Product.id == Movement.product_id)
+        .join(User, User.id == Movement.user_id)
+        .order_by(Movement.id)
+    )
+    
+    if filters['start']:
+        query = query.where(Movement.created_at >= filters['start'])
+    if filters['end']:
+        query = query.where(Movement.created_at < filters['end'] + timedelta(days=1))
+    if filters['product_id']:
+        query = query.where(Movement.product_id == filters['product_id'])
+    elif filters['product']:
+        query = query.where(Product.code == filters['product'])
     
-    return jsonify(activities)
+    return query.execution_options(yield_per=LEDGER_CHUNK_SIZE)
+
+def _ledger_rows(filters):
+    for row in db.session.execute(_ledger_query(filters)):
+        movement_id, created_at, movement_type, code, name, quantity, user_name, notes = row
+        yield [
+            movement_id,
+            created_at.strftime('%d/%m/%Y %H:%M:%S') if created_at else '',
+            LEDGER_TYPES.get(movement_type, movement_type),
+            code,
+            name,
+            quantity,
+            user_name,
+            notes or ''
+        ]
 
 @reports_bp.route('/export/csv')
 @login_required
 def export_csv():
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow(['Relatório de Atividades - WMS Sistema'])
-    writer.writerow(['Gerado em:', datetime.now().strftime('%d/%m/%Y %H:%M')])
-    writer.writerow([])
-    
-    writer.writerow(['Estatísticas de Usuários'])
-    writer.writerow(['Tipo', 'Quantidade'])
-    writer.writerow(['Total de Usuários', User.query.count()])
-    writer.writerow(['Usuários Ativos', User.query.filter_by(active=True).count()])
-    writer.writerow(['Administradores', User.query.filter_by(role='admin').count()])
-    writer.writerow([])
-    
-    writer.writerow(['Atividades Recentes'])
-    writer.writerow(['Tipo', 'Item', 'Quantidade', 'Data/Hora'])
-    
-    activities = [
-        ['Entrada', 'Notebook Dell XPS 15', 10, '2024-11-01 10:30'],
-        ['Saída', 'Mouse Logitech MX Master', 5, '2024-11-01 09:15'],
-        ['Entrada', 'Teclado Mecânico RGB', 15, '2024-10-31 16:45'],
-        ['Saída', 'Monitor LG 27"', 3, '2024-10-31 14:20'],
-        ['Entrada', 'Webcam Logitech C920', 8, '2024-10-31 11:00'],
-        ['Ajuste', 'Headset HyperX Cloud', -2, '2024-10-30 15:30'],
-    ]
-    
-    for activity in activities:
-        writer.writerow(activity)
-    
-    response = Response(output.getvalue(), mimetype='text/csv')
-    response.headers['Content-Disposition'] = f'attachment; filename=relatorio_wms_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    filters = _ledger_filters()
+    
+    def generate():
+        output = StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['ID', 'Data/Hora', 'Tipo', 'Código', 'Produto', 'Quantidade', 'Usuário', 'Observações'])
+        
+        for i, row in enumerate(_ledger_rows(filters), 1):
+            writer.writerow(row)
+            if i % LEDGER_CHUNK_SIZE == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        
+        yield output.getvalue()
+    
+    response = Response(stream_with_context(generate()), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=movimentacoes_wms_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
     
     return response
 
-@reports_bp.route('/export/xlsx')
-@login_required
-def export_xlsx():
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Relatório WMS"
+MAX_COLUMN_WIDTH = 50
+EXCEL_MAX_ROWS = 1048576
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PDF_MIMETYPE = 'application/pdf'
+
+def _download_name(prefix, extension):
+    return f'{prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+def _column_widths(headers, lengths):
+    return [
+        min(max(len(header), length or 0) + 2, MAX_COLUMN_WIDTH)
+        for header, length in zip(headers, lengths)
+    ]
+
+def _max_lengths(*columns):
+    return db.session.query(*[db.func.max(db.func.length(c)) for c in columns]).one()
+
+def _new_sheet(wb, title, headers, widths):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+    
+    ws = wb.create_sheet(title)
+    for i, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    ws.freeze_panes = 'A2'
     
     header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
     header_font = Font(bold=True, color="FFFFFF", size=12)
-    
-    ws['A1'] = 'Relatório de Atividades - WMS Sistema'
-    ws['A1'].font = Font(bold=True, size=14)
-    ws.merge_cells('A1:D1')
-    
-    ws['A2'] = f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}'
-    ws.merge_cells('A2:D2')
-    ws['A2'].font = Font(italic=True)
-    
-    ws.append([])
-    
-    ws.append(['Estatísticas de Usuários'])
-    ws[f'A{ws.max_row}'].font = Font(bold=True, size=12)
-    
-    headers = ['Tipo', 'Quantidade']
-    ws.append(headers)
-    for cell in ws[ws.max_row]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    ws.append(['Total de Usuários', User.query.count()])
-    ws.append(['Usuários Ativos', User.query.filter_by(active=True).count()])
-    ws.append(['Administradores', User.query.filter_by(role='admin').count()])
-    ws.append(['Usuários Regulares', User.query.filter_by(role='user').count()])
-    
-    ws.append([])
-    
-    ws.append(['Produtos em Estoque'])
-    ws[f'A{ws.max_row}'].font = Font(bold=True, size=12)
-    
-    product_headers = ['Código', 'Nome', 'Categoria', 'Quantidade', 'Localização']
-    ws.append(product_headers)
-    for cell in ws[ws.max_row]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    products = Product.query.all()
-    for product in products:
-        ws.append([
-            product.code,
-            product.name,
-            product.category,
-            product.quantity,
-            product.location or 'N/A'
-        ])
-    
-    ws.append([])
-    
-    ws.append(['Atividades Recentes'])
-    ws[f'A{ws.max_row}'].font = Font(bold=True, size=12)
-    
-    activity_headers = ['Tipo', 'Item', 'Quantidade', 'Data/Hora']
-    ws.append(activity_headers)
-    for cell in ws[ws.max_row]:
+    header_row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
         cell.fill = header_fill
         cell.font = header_font
         cell.alignment = Alignment(horizontal='center')
+        header_row.append(cell)
+    ws.append(header_row)
+    return ws
+
+def _write_sheet(wb, title, headers, widths, rows):
+    ws = _new_sheet(wb, title, headers, widths)
+    written, part = 1, 1
+    for row in rows:
+        if written == EXCEL_MAX_ROWS:
+            part += 1
+            ws = _new_sheet(wb, f'{title} ({part})', headers, widths)
+            written = 1
+        ws.append(row)
+        written += 1
+
+def _product_rows():
+    query = (
+        db.select(
+            Product.code,
+            Product.name,
+            Product.category,
+            Product.unit,
+            Product.quantity,
+            Product.min_quantity,
+            Product.location
+        )
+        .where(Product.active)
+        .order_by(Product.name, Product.id)
+        .execution_options(yield_per=LEDGER_CHUNK_SIZE)
+    )
+    for code, name, category, unit, quantity, min_quantity, location in db.session.execute(query):
+        yield [code, name, category, unit, quantity, min_quantity, location or 'N/A']
+
+def build_xlsx(output, filters):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    
+    wb = Workbook(write_only=True)
+    
+    summary = wb.create_sheet('Resumo')
+    summary.column_dimensions['A'].width = 30
+    summary.column_dimensions['B'].width = 20
+    title = WriteOnlyCell(summary, value='Relatório de Atividades - WMS Sistema')
+    title.font = Font(bold=True, size=14)
+    summary.append([title])
+    generated = WriteOnlyCell(summary, value=f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M")}')
+    generated.font = Font(italic=True)
+    summary.append([generated])
+    summary.append([])
+    users = compute_user_stats()
+    summary.append(['Total de Usuários', users['total']])
+    summary.append(['Usuários Ativos', users['active']])
+    summary.append(['Administradores', users['admins']])
+    summary.append(['Usuários Regulares', users['regular']])
+    
+    product_headers = ['Código', 'Nome', 'Categoria', 'Unidade', 'Quantidade', 'Estoque Mínimo', 'Localização']
+    code_len, name_len, category_len, location_len = _max_lengths(
+        Product.code, Product.name, Product.category, Product.location
+    )
+    _write_sheet(
+        wb,
+        'Produtos',
+        product_headers,
+        _column_widths(product_headers, [code_len, name_len, category_len, 4, 10, 10, location_len]),
+        _product_rows()
+    )
     
-    activities = [
-        ['Entrada', 'Notebook Dell XPS 15', 10, '2024-11-01 10:30'],
-        ['Saída', 'Mouse Logitech MX Master', 5, '2024-11-01 09:15'],
-        ['Entrada', 'Teclado Mecânico RGB', 15, '2024-10-31 16:45'],
-        ['Saída', 'Monitor LG 27"', 3, '2024-10-31 14:20'],
-        ['Entrada', 'Webcam Logitech C920', 8, '2024-10-31 11:00'],
-        ['Ajuste', 'Headset HyperX Cloud', -2, '2024-10-30 15:30'],
-    ]
+    movement_headers = ['ID', 'Data/Hora', 'Tipo', 'Código', 'Produto', 'Quantidade', 'Usuário', 'Observações']
+    user_len, = _max_lengths(User.name)
+    _write_sheet(
+        wb,
+        'Movimentações',
+        movement_headers,
+        _column_widths(movement_headers, [10, 19, 8, code_len, name_len, 10, user_len, MAX_COLUMN_WIDTH]),
+        _ledger_rows(filters)
+    )
     
-    for activity in activities:
-        ws.append(activity)
-    
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    output = BytesIO()
     wb.save(output)
+
+@reports_bp.route('/export/xlsx')
+@login_required
+def export_xlsx():
+    output = tempfile.TemporaryFile()
+    build_xlsx(output, _ledger_filters())
     output.seek(0)
     
-    response = Response(output.getvalue(), mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response.headers['Content-Disposition'] = f'attachment; filename=relatorio_wms_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    
-    return response
+    return send_file(
+        output,
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=_download_name('relatorio_wms', 'xlsx')
+    )
 
-@reports_bp.route('/export/pdf')
-@login_required
-def export_pdf():
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
+def build_pdf(output, filters=None):
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    
+    doc = SimpleDocTemplate(output, pagesize=A4)
     elements = []
     
     styles = getSampleStyleSheet()
@@ -253,19 +336,14 @@ def export_pdf():
     
     elements.append(Paragraph('1. Estatísticas de Usuários', heading_style))
     
-    total_users = User.query.count()
-    active_users = User.query.filter(User.active.is_(True)).count()
-    inactive_users = total_users - active_users
-    admin_users = User.query.filter_by(role='admin').count()
-    regular_users = User.query.filter_by(role='user').count()
-    
+    users = compute_user_stats()
     user_data = [
         ['Métrica', 'Quantidade'],
-        ['Total de Usuários', str(total_users)],
-        ['Usuários Ativos', str(active_users)],
-        ['Usuários Inativos', str(inactive_users)],
-        ['Administradores', str(admin_users)],
-        ['Usuários Regulares', str(regular_users)],
+        ['Total de Usuários', str(users['total'])],
+        ['Usuários Ativos', str(users['active'])],
+        ['Usuários Inativos', str(users['inactive'])],
+        ['Administradores', str(users['admins'])],
+        ['Usuários Regulares', str(users['regular'])],
     ]
     
     user_table = Table(user_data, colWidths=[3.5*inch, 2*inch])
@@ -288,14 +366,16 @@ def export_pdf():
     
     elements.append(Paragraph('2. Estoque por Categoria', heading_style))
     
-    categories = ['Eletrônicos', 'Roupas', 'Alimentos', 'Móveis', 'Ferramentas', 'Outros']
-    quantities = [random.randint(20, 100) for _ in range(len(categories))]
-    
-    category_data = [['Categoria', 'Quantidade em Estoque']]
-    for cat, qty in zip(categories, quantities):
-        category_data.append([cat, str(qty)])
+    category_data = [['Categoria', 'Produtos', 'Quantidade em Estoque', 'Estoque Baixo']]
+    for category in category_stats():
+        category_data.append([
+            category['category'],
+            str(category['skus']),
+            str(category['units']),
+            str(category['low_stock'])
+        ])
     
-    category_table = Table(category_data, colWidths=[3.5*inch, 2*inch])
+    category_table = Table(category_data, colWidths=[2*inch, 1.2*inch, 1.8*inch, 1.3*inch])
     category_table.setStyle(TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -314,17 +394,10 @@ def export_pdf():
     
     elements.append(Paragraph('3. Movimentações de Estoque (Últimos 7 dias)', heading_style))
     
-    days = 7
+    series = movement_series(7)
     movement_data = [['Data', 'Entradas', 'Saídas']]
-    for i in range(days):
-        date = datetime.now() - timedelta(days=days-i-1)
-        entries = random.randint(10, 50)
-        exits = random.randint(5, 45)
-        movement_data.append([
-            date.strftime('%d/%m'),
-            str(entries),
-            str(exits)
-        ])
+    for label, entries, exits in zip(series['labels'], series['entries'], series['exits']):
+        movement_data.append([label, str(entries), str(exits)])
     
     movement_table = Table(movement_data, colWidths=[2*inch, 1.75*inch, 1.75*inch])
     movement_table.setStyle(TableStyle([
@@ -345,7 +418,7 @@ def export_pdf():
     
     elements.append(Paragraph('4. Produtos em Estoque', heading_style))
     
-    products = Product.query.limit(10).all()
+    products = Product.query.filter(Product.active).order_by(Product.name, Product.id).limit(10).all()
     product_data = [['Código', 'Nome', 'Quantidade', 'Localização']]
     
     for product in products:
@@ -377,9 +450,73 @@ def export_pdf():
     elements.append(product_table)
     
     doc.build(elements)
+
+@reports_bp.route('/export/pdf')
+@login_required
+def export_pdf():
+    buffer = BytesIO()
+    build_pdf(buffer)
     
     buffer.seek(0)
-    response = Response(buffer.getvalue(), mimetype='application/pdf')
-    response.headers['Content-Disposition'] = f'attachment; filename=graficos_wms_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
+    response = Response(buffer.getvalue(), mimetype=PDF_MIMETYPE)
+    response.headers['Content-Disposition'] = f'attachment; filename={_download_name("graficos_wms", "pdf")}'
     
     return response
+
+REPORT_BUILDERS = {
+    'xlsx': (build_xlsx, 'relatorio_wms', XLSX_MIMETYPE),
+    'pdf': (build_pdf, 'graficos_wms', PDF_MIMETYPE),
+}
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+def submit_job():
+    kind = request.form.get('kind') or request.args.get('kind')
+    if kind not in REPORT_BUILDERS:
+        return jsonify({'success': False, 'message': 'Tipo de relatório inválido.'}), 400
+    
+    builder, prefix, mimetype = REPORT_BUILDERS[kind]
+    try:
+        job = jobs.submit(kind, builder, _ledger_filters(), current_user.id,
+                          _download_name(prefix, kind), mimetype)
+    except jobs.JobQueueFull:
+        return jsonify({'success': False, 'message': 'Fila de relatórios cheia. Tente novamente em instantes.'}), 503
+    
+    return jsonify(_job_payload(job)), 202
+
+@reports_bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    return jsonify(_job_payload(_get_job_or_404(job_id)))
+
+@reports_bp.route('/jobs/<job_id>/download')
+@login_required
+def download_job(job_id):
+    job = _get_job_or_404(job_id)
+    if job['status'] != 'done':
+        abort(409)
+    
+    return send_file(
+        jobs.output_path(job),
+        mimetype=job['mimetype'],
+        as_attachment=True,
+        download_name=job['download_name']
+    )
+
+def _get_job_or_404(job_id):
+    job = jobs.get_job(job_id)
+    if job is None or (job['user_id'] != current_user.id and not current_user.is_admin()):
+        abort(404)
+    return job
+
+def _job_payload(job):
+    payload = {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'error': job['error'],
+        'status_url': url_for('reports.job_status', job_id=job['id'])
+    }
+    if job['status'] == 'done':
+        payload['download_url'] = url_for('reports.download_job', job_id=job['id'])
+    return payload
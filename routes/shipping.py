@@ -1,26 +1,73 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify, abort
 from flask_login import login_required, current_user
 from routes import shipping_bp
 from models import db, Product, Shipment, ShipmentItem
-from datetime import datetime
+from stats import shipment_stats, invalidate
+from instrumentation import query_budget
+from pagination import keyset_page, parse_page_size
+from inventory import reserve, release_reserved, ship_reserved, InsufficientStock
+from dispatch import dispatch_shipments
+from ingest import read_records, pasted_records, add_shipment_items, BatchTooLarge
+from events import queue_event, queue_shipment
+from ledger import record_shipments
+from datetime import datetime, timedelta
+
+SHIPMENT_STATUSES = ('pending', 'in_progress', 'shipped')
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+def _shipment_filters():
+    status = request.args.get('status', '')
+    return {
+        'status': status if status in SHIPMENT_STATUSES else '',
+        'start': _parse_date(request.args.get('start')),
+        'end': _parse_date(request.args.get('end')),
+    }
+
+def _item_totals(shipment_ids):
+    if not shipment_ids:
+        return {}
+    rows = (
+        db.session.query(
+            ShipmentItem.shipment_id,
+            db.func.count(ShipmentItem.id),
+            db.func.coalesce(db.func.sum(ShipmentItem.quantity), 0)
+        )
+        .filter(ShipmentItem.shipment_id.in_(shipment_ids))
+        .group_by(ShipmentItem.shipment_id)
+        .all()
+    )
+    return {shipment_id: (count, total) for shipment_id, count, total in rows}
 
 @shipping_bp.route('/')
 @login_required
+@query_budget(5)
 def index():
-    shipments = Shipment.query.order_by(Shipment.created_at.desc()).all()
+    filters = _shipment_filters()
+    query = Shipment.query
+    if filters['status']:
+        query = query.filter(Shipment.status == filters['status'])
+    if filters['start']:
+        query = query.filter(Shipment.created_at >= filters['start'])
+    if filters['end']:
+        query = query.filter(Shipment.created_at < filters['end'] + timedelta(days=1))
     
-    pending = Shipment.query.filter_by(status='pending').count()
-    in_progress = Shipment.query.filter_by(status='in_progress').count()
-    shipped = Shipment.query.filter_by(status='shipped').count()
+    page, next_cursor = keyset_page(
+        query,
+        [Shipment.created_at, Shipment.id],
+        cursor=request.args.get('after'),
+        page_size=parse_page_size(request.args.get('per_page')),
+        descending=True
+    )
+    totals = _item_totals([shipment.id for shipment in page])
+    shipments = [(shipment,) + totals.get(shipment.id, (0, 0)) for shipment in page]
     
-    stats = {
-        'pending': pending,
-        'in_progress': in_progress,
-        'shipped': shipped,
-        'total': Shipment.query.count()
-    }
-    
-    return render_template('shipping.html', shipments=shipments, stats=stats)
+    return render_template('shipping.html', shipments=shipments, stats=shipment_stats(), filters=filters,
+                           next_cursor=next_cursor, is_first_page=not request.args.get('after'))
 
 @shipping_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -46,7 +93,10 @@ def add_shipment():
             )
             
             db.session.add(shipment)
+            db.session.flush()
+            queue_shipment(shipment.id, order_number, 'pending')
             db.session.commit()
+            invalidate('shipments')
             
             flash(f'Expedição {order_number} criada com sucesso!', 'success')
             return redirect(url_for('shipping.view_shipment', shipment_id=shipment.id))
@@ -58,10 +108,35 @@ def add_shipment():
 
 @shipping_bp.route('/view/<int:shipment_id>')
 @login_required
+@query_budget(5)
 def view_shipment(shipment_id):
-    shipment = Shipment.query.get_or_404(shipment_id)
-    products = Product.query.filter(Product.quantity > 0).order_by(Product.name).all()
-    return render_template('view_shipment.html', shipment=shipment, products=products)
+    shipment = Shipment.query.options(db.joinedload(Shipment.user)).filter_by(id=shipment_id).first_or_404()
+    items = (
+        ShipmentItem.query
+        .join(ShipmentItem.product)
+        .options(db.contains_eager(ShipmentItem.product))
+        .filter(ShipmentItem.shipment_id == shipment_id)
+        .order_by(ShipmentItem.id)
+        .all()
+    )
+    product_totals = (
+        db.session.query(
+            Product.code,
+            Product.name,
+            Product.unit,
+            Product.quantity,
+            db.func.count(ShipmentItem.id).label('lines'),
+            db.func.sum(ShipmentItem.quantity).label('total')
+        )
+        .join(ShipmentItem, ShipmentItem.product_id == Product.id)
+        .filter(ShipmentItem.shipment_id == shipment_id)
+        .group_by(Product.id, Product.code, Product.name, Product.unit, Product.quantity)
+        .order_by(Product.code)
+        .all()
+    )
+    
+    return render_template('view_shipment.html', shipment=shipment, items=items, product_totals=product_totals,
+                           total_quantity=sum(row.total for row in product_totals))
 
 @shipping_bp.route('/add_item/<int:shipment_id>', methods=['POST'])
 @login_required
@@ -71,9 +146,22 @@ def add_item(shipment_id):
         product_id = int(request.form.get('product_id'))
         quantity = int(request.form.get('quantity'))
         
-        product = Product.query.get_or_404(product_id)
+        if shipment.shipped_at:
+            flash('Não é possível alterar uma expedição já enviada.', 'danger')
+            return redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
+        
+        if quantity <= 0:
+            flash('A quantidade deve ser maior que zero.', 'danger')
+            return redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
         
-        if product.quantity < quantity:
+        if not db.session.query(Product.active).filter_by(id=product_id).scalar():
+            flash('Produto não encontrado ou desativado.', 'danger')
+            return redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
+        
+        try:
+            reserve(product_id, quantity)
+        except InsufficientStock:
+            db.session.rollback()
             flash('Quantidade insuficiente em estoque!', 'danger')
             return redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
         
@@ -93,6 +181,68 @@ def add_item(shipment_id):
     
     return redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
 
+def _open_shipment(shipment_id):
+    shipment = db.session.query(Shipment.id, Shipment.shipped_at).filter_by(id=shipment_id).first()
+    if shipment is None:
+        abort(404)
+    return shipment
+
+@shipping_bp.route('/add_items/<int:shipment_id>', methods=['POST'])
+@login_required
+def add_items(shipment_id):
+    shipment = _open_shipment(shipment_id)
+    if 'lines' not in request.form:
+        return _add_items_api(shipment)
+    
+    redirect_to = redirect(url_for('shipping.view_shipment', shipment_id=shipment_id))
+    if shipment.shipped_at:
+        flash('Não é possível alterar uma expedição já enviada.', 'danger')
+        return redirect_to
+    
+    try:
+        added, errors = add_shipment_items(shipment_id, pasted_records(request.form['lines']))
+        db.session.commit()
+    except (BatchTooLarge, InsufficientStock) as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect_to
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao adicionar itens: {str(e)}', 'danger')
+        return redirect_to
+    
+    if added:
+        flash(f'{added} produto(s) adicionado(s) à expedição!', 'success')
+    for error in errors[:10]:
+        flash(f'Linha {error["line"]}: {error["message"]}', 'warning')
+    if len(errors) > 10:
+        flash(f'... e mais {len(errors) - 10} erro(s).', 'warning')
+    return redirect_to
+
+def _add_items_api(shipment):
+    if shipment.shipped_at:
+        return jsonify({'success': False, 'message': 'Não é possível alterar uma expedição já enviada.'}), 409
+    
+    all_or_nothing = request.args.get('all_or_nothing') == '1'
+    try:
+        added, errors = add_shipment_items(shipment.id, read_records(request))
+    except BatchTooLarge as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 413
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Erro ao adicionar itens: {str(e)}'}), 500
+    
+    if errors and all_or_nothing:
+        db.session.rollback()
+        return jsonify({'success': False, 'added': 0, 'errors': errors}), 422
+    
+    db.session.commit()
+    return jsonify({'success': not errors, 'added': added, 'errors': errors})
+
 @shipping_bp.route('/remove_item/<int:item_id>', methods=['POST'])
 @login_required
 def remove_item(item_id):
@@ -100,6 +250,9 @@ def remove_item(item_id):
         item = ShipmentItem.query.get_or_404(item_id)
         shipment_id = item.shipment_id
         
+        if not item.shipment.shipped_at:
+            release_reserved({item.product_id: item.quantity})
+        
         db.session.delete(item)
         db.session.commit()
         
@@ -116,34 +269,54 @@ def update_status(shipment_id):
     try:
         shipment = Shipment.query.get_or_404(shipment_id)
         new_status = request.form.get('status')
+        previous_status = shipment.status
         
-        if new_status == 'shipped' and not shipment.shipped_at:
-            product_totals = {}
-            for item in shipment.items:
-                if item.product_id not in product_totals:
-                    product_totals[item.product_id] = {
-                        'product': item.product,
-                        'quantity': 0
-                    }
-                product_totals[item.product_id]['quantity'] += item.quantity
+        if new_status not in SHIPMENT_STATUSES:
+            flash('Status de expedição inválido.', 'danger')
+            return redirect(url_for('shipping.index'))
+        if shipment.shipped_at:
+            if new_status != 'shipped':
+                flash('Expedição já enviada não pode mudar de status.', 'danger')
+            return redirect(url_for('shipping.index'))
+        
+        if new_status == 'shipped':
+            claimed = db.session.execute(
+                db.update(Shipment)
+                .where(Shipment.id == shipment_id, Shipment.shipped_at.is_(None))
+                .values(status=new_status, shipped_at=datetime.utcnow())
+            ).rowcount
             
-            for product_id, data in product_totals.items():
-                product = data['product']
-                required_qty = data['quantity']
-                if product.quantity < required_qty:
-                    flash(f'Estoque insuficiente para {product.name}! Disponível: {product.quantity}, Necessário: {required_qty}', 'danger')
+            if claimed:
+                product_totals = dict(
+                    db.session.query(ShipmentItem.product_id, db.func.sum(ShipmentItem.quantity))
+                    .filter(ShipmentItem.shipment_id == shipment_id)
+                    .group_by(ShipmentItem.product_id)
+                    .all()
+                )
+                try:
+                    ship_reserved(product_totals)
+                except InsufficientStock as e:
+                    db.session.rollback()
+                    for message in e.messages:
+                        flash(message, 'danger')
                     return redirect(url_for('shipping.index'))
-            
-            shipment.status = new_status
-            shipment.shipped_at = datetime.utcnow()
-            
-            for product_id, data in product_totals.items():
-                product = data['product']
-                product.quantity -= data['quantity']
+                record_shipments([(shipment.order_number, product_totals)], current_user.id)
+                queue_shipment(shipment_id, shipment.order_number, new_status, previous_status)
         else:
-            shipment.status = new_status
+            changed = db.session.execute(
+                db.update(Shipment)
+                .where(Shipment.id == shipment_id, Shipment.shipped_at.is_(None))
+                .values(status=new_status)
+            ).rowcount
+            if not changed:
+                db.session.rollback()
+                flash('Expedição já enviada não pode mudar de status.', 'danger')
+                return redirect(url_for('shipping.index'))
+            if new_status != previous_status:
+                queue_shipment(shipment_id, shipment.order_number, new_status, previous_status)
         
         db.session.commit()
+        invalidate('stock', 'movements', 'shipments', 'categories')
         
         flash(f'Status da expedição atualizado!', 'success')
     except Exception as e:
@@ -152,6 +325,36 @@ def update_status(shipment_id):
     
     return redirect(url_for('shipping.index'))
 
+@shipping_bp.route('/dispatch', methods=['POST'])
+@login_required
+def dispatch():
+    if request.is_json:
+        shipment_ids = (request.get_json(silent=True) or {}).get('shipment_ids', [])
+    else:
+        shipment_ids = request.form.getlist('shipment_ids')
+    
+    try:
+        shipment_ids = [int(shipment_id) for shipment_id in shipment_ids]
+        shipped, failed = dispatch_shipments(shipment_ids, current_user.id)
+        db.session.commit()
+        if shipped:
+            invalidate('stock', 'movements', 'shipments', 'categories')
+    except Exception as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(f'Erro ao expedir pedidos: {str(e)}', 'danger')
+        return redirect(url_for('shipping.index'))
+    
+    if request.is_json:
+        return jsonify({'success': not failed, 'shipped': shipped, 'failed': failed})
+    
+    if shipped:
+        flash(f'{len(shipped)} expedições enviadas com sucesso!', 'success')
+    for shipment in failed:
+        flash(f'Pedido {shipment["order_number"] or shipment["id"]}: {shipment["message"]}', 'danger')
+    return redirect(url_for('shipping.index'))
+
 @shipping_bp.route('/delete/<int:shipment_id>', methods=['POST'])
 @login_required
 def delete_shipment(shipment_id):
@@ -159,8 +362,19 @@ def delete_shipment(shipment_id):
         shipment = Shipment.query.get_or_404(shipment_id)
         order_number = shipment.order_number
         
+        if not shipment.shipped_at:
+            release_reserved(dict(
+                db.session.query(ShipmentItem.product_id, db.func.sum(ShipmentItem.quantity))
+                .filter(ShipmentItem.shipment_id == shipment_id)
+                .group_by(ShipmentItem.product_id)
+                .all()
+            ))
+        ShipmentItem.query.filter_by(shipment_id=shipment_id).delete(synchronize_session=False)
+        db.session.expire(shipment, ['items'])
+        queue_event('shipment_deleted', {'id': shipment_id, 'status': shipment.status})
         db.session.delete(shipment)
         db.session.commit()
+        invalidate('shipments')
         
         flash(f'Expedição {order_number} excluída com sucesso!', 'success')
     except Exception as e:
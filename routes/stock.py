@@ -1,23 +1,104 @@
-from flask import render_template, redirect, url_for, flash, request
+from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from routes import stock_bp
-from models import db, Product
+from models import db, Product, Movement
+from pagination import keyset_page, parse_page_size
+from stats import stock_stats, invalidate
+from ingest import read_records, import_products
+from search import search_products, SEARCH_LIMIT
+from events import queue_event, queue_movement, track_quantities, publish
+from rollup import record_movement
+from ledger import OPENING_BALANCE_NOTE
+
+def _product_filters():
+    return {
+        'category': request.args.get('category', '').strip(),
+        'location': request.args.get('location', '').strip(),
+        'low_stock': request.args.get('low_stock') == '1',
+        'inactive': request.args.get('inactive') == '1',
+    }
+
+def _product_page(filters):
+    query = Product.query.filter(Product.active == (not filters['inactive']))
+    if filters['category']:
+        query = query.filter(Product.category == filters['category'])
+    if filters['location']:
+        query = query.filter(Product.location.startswith(filters['location'], autoescape=True))
+    if filters['low_stock']:
+        query = query.filter(Product.quantity <= Product.min_quantity)
+    
+    return keyset_page(
+        query,
+        [Product.name, Product.id],
+        cursor=request.args.get('after'),
+        page_size=parse_page_size(request.args.get('per_page'))
+    )
+
+def _record_adjustment(product, quantity, notes):
+    movement = Movement(
+        product_id=product.id,
+        type='ajuste',
+        quantity=quantity,
+        user_id=current_user.id,
+        notes=notes
+    )
+    db.session.add(movement)
+    db.session.flush()
+    record_movement(movement, product)
+    queue_movement(movement, product, current_user.name)
 
 @stock_bp.route('/')
 @login_required
 def index():
-    products = Product.query.order_by(Product.name).all()
-    low_stock = Product.query.filter(Product.quantity <= Product.min_quantity).count()
-    total_products = Product.query.count()
-    total_items = db.session.query(db.func.sum(Product.quantity)).scalar() or 0
+    filters = _product_filters()
+    products, next_cursor = _product_page(filters)
     
-    stats = {
-        'total_products': total_products,
-        'total_items': total_items,
-        'low_stock': low_stock
-    }
+    return render_template('stock.html', products=products, stats=stock_stats(), filters=filters,
+                           next_cursor=next_cursor, is_first_page=not request.args.get('after'))
+
+@stock_bp.route('/api/products')
+@login_required
+def api_products():
+    products, next_cursor = _product_page(_product_filters())
     
-    return render_template('stock.html', products=products, stats=stats)
+    return jsonify({
+        'products': [{
+            'id': p.id,
+            'code': p.code,
+            'name': p.name,
+            'category': p.category,
+            'unit': p.unit,
+            'quantity': p.quantity,
+            'reserved_quantity': p.reserved_quantity,
+            'available_quantity': p.available_quantity,
+            'min_quantity': p.min_quantity,
+            'location': p.location
+        } for p in products],
+        'next_cursor': next_cursor
+    })
+
+@stock_bp.route('/api/search')
+@login_required
+def api_search():
+    products = search_products(
+        request.args.get('q', ''),
+        limit=request.args.get('limit', SEARCH_LIMIT, type=int),
+        in_stock=request.args.get('in_stock') == '1'
+    )
+    
+    return jsonify({
+        'products': [{
+            'id': p.id,
+            'code': p.code,
+            'name': p.name,
+            'category': p.category,
+            'location': p.location,
+            'unit': p.unit,
+            'quantity': p.quantity,
+            'reserved_quantity': p.reserved_quantity,
+            'available_quantity': p.available_quantity
+        } for p in products]
+    })
 
 @stock_bp.route('/add', methods=['POST'])
 @login_required
@@ -32,8 +113,12 @@ def add_product():
         min_quantity = int(request.form.get('min_quantity', 10))
         location = request.form.get('location', '')
         
-        if Product.query.filter_by(code=code).first():
-            flash('Código do produto já existe.', 'danger')
+        existing = Product.query.filter_by(code=code).first()
+        if existing:
+            if not existing.active:
+                flash('Código pertence a um produto desativado. Reative-o na lista de inativos.', 'danger')
+            else:
+                flash('Código do produto já existe.', 'danger')
             return redirect(url_for('stock.index'))
         
         product = Product(
@@ -48,7 +133,12 @@ def add_product():
         )
         
         db.session.add(product)
+        db.session.flush()
+        if quantity:
+            _record_adjustment(product, quantity, OPENING_BALANCE_NOTE)
+        queue_event('refresh', {'scope': 'stock'})
         db.session.commit()
+        invalidate('stock', 'movements', 'categories')
         
         flash(f'Produto {name} adicionado com sucesso!', 'success')
     except Exception as e:
@@ -57,6 +147,39 @@ def add_product():
     
     return redirect(url_for('stock.index'))
 
+@stock_bp.route('/import', methods=['POST'])
+@login_required
+def import_products_view():
+    wants_json = request.is_json or request.args.get('format') == 'json'
+    try:
+        imported, errors, total_errors = import_products(read_records(request), current_user.id)
+    except Exception as e:
+        db.session.rollback()
+        if wants_json:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        flash(f'Erro ao importar produtos: {str(e)}', 'danger')
+        return redirect(url_for('stock.index'))
+    finally:
+        invalidate('stock', 'movements', 'categories')
+    
+    if imported:
+        publish([('refresh', {'scope': 'stock'})])
+    
+    if wants_json:
+        return jsonify({
+            'success': not total_errors,
+            'imported': imported,
+            'error_count': total_errors,
+            'errors': errors
+        })
+    
+    flash(f'{imported} produtos importados.', 'success' if not total_errors else 'warning')
+    for error in errors[:5]:
+        flash(f'Linha {error["line"]}: {error["message"]}', 'danger')
+    if total_errors > 5:
+        flash(f'... e mais {total_errors - 5} linhas com erro.', 'danger')
+    return redirect(url_for('stock.index'))
+
 @stock_bp.route('/edit/<int:product_id>', methods=['GET', 'POST'])
 @login_required
 def edit_product(product_id):
@@ -64,16 +187,23 @@ def edit_product(product_id):
     
     if request.method == 'POST':
         try:
+            previous = product.quantity or 0
+            quantity = int(request.form.get('quantity', 0))
             product.code = request.form.get('code')
             product.name = request.form.get('name')
             product.description = request.form.get('description', '')
             product.category = request.form.get('category')
             product.unit = request.form.get('unit', 'UN')
-            product.quantity = int(request.form.get('quantity', 0))
             product.min_quantity = int(request.form.get('min_quantity', 10))
             product.location = request.form.get('location', '')
             
+            if quantity != previous:
+                track_quantities({product.id: previous})
+                product.quantity = quantity
+                _record_adjustment(product, quantity, 'Ajuste na edição do produto')
+            
             db.session.commit()
+            invalidate('stock', 'movements', 'categories')
             flash(f'Produto {product.name} atualizado com sucesso!', 'success')
             return redirect(url_for('stock.index'))
         except Exception as e:
@@ -82,18 +212,40 @@ def edit_product(product_id):
     
     return render_template('edit_product.html', product=product)
 
-@stock_bp.route('/delete/<int:product_id>', methods=['POST'])
+@stock_bp.route('/deactivate/<int:product_id>', methods=['POST'])
 @login_required
-def delete_product(product_id):
+def deactivate_product(product_id):
     try:
         product = Product.query.get_or_404(product_id)
-        name = product.name
-        db.session.delete(product)
+        if product.reserved_quantity:
+            flash(f'Produto {product.name} possui {product.reserved_quantity} unidades reservadas em expedições pendentes e não pode ser desativado.', 'danger')
+            return redirect(url_for('stock.index'))
+        
+        product.active = False
+        queue_event('refresh', {'scope': 'stock'})
         db.session.commit()
+        invalidate('stock', 'categories')
         
-        flash(f'Produto {name} excluído com sucesso!', 'success')
+        flash(f'Produto {product.name} desativado com sucesso!', 'success')
     except Exception as e:
         db.session.rollback()
-        flash(f'Erro ao excluir produto: {str(e)}', 'danger')
+        flash(f'Erro ao desativar produto: {str(e)}', 'danger')
     
     return redirect(url_for('stock.index'))
+
+@stock_bp.route('/reactivate/<int:product_id>', methods=['POST'])
+@login_required
+def reactivate_product(product_id):
+    try:
+        product = Product.query.get_or_404(product_id)
+        product.active = True
+        queue_event('refresh', {'scope': 'stock'})
+        db.session.commit()
+        invalidate('stock', 'categories')
+        
+        flash(f'Produto {product.name} reativado com sucesso!', 'success')
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erro ao reativar produto: {str(e)}', 'danger')
+    
+    return redirect(url_for('stock.index', inactive='1'))
@@ -0,0 +1,102 @@
+import re
+from models import db, Product
+
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+PG_SEARCH_VECTOR = (
+    "to_tsvector('simple'::regconfig, coalesce(products.code, '') || ' ' || coalesce(products.name, '') "
+    "|| ' ' || coalesce(products.category, '') || ' ' || coalesce(products.location, ''))"
+)
+
+PG_SEARCH_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ({PG_SEARCH_VECTOR})',
+    'CREATE INDEX IF NOT EXISTS ix_products_code_trgm ON products USING GIN (code gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING GIN (name gin_trgm_ops)',
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "code, name, category, location, content='products', content_rowid='id', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, code, name, category, location) "
+    "VALUES (new.id, new.code, new.name, new.category, new.location); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, code, name, category, location) "
+    "VALUES ('delete', old.id, old.code, old.name, old.category, old.location); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF code, name, category, location ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, code, name, category, location) "
+    "VALUES ('delete', old.id, old.code, old.name, old.category, old.location); "
+    "INSERT INTO products_fts(rowid, code, name, category, location) "
+    "VALUES (new.id, new.code, new.name, new.category, new.location); END",
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+_fts_available = {}
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+def _tokens(term):
+    return re.findall(r'\w+', term.lower())[:8]
+
+def build_search_index():
+    statements = {'postgresql': PG_SEARCH_DDL, 'sqlite': SQLITE_SEARCH_DDL}.get(_dialect(), [])
+    for statement in statements:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+    _fts_available.clear()
+    return len(statements)
+
+def _has_sqlite_fts():
+    bind = db.session.get_bind()
+    key = str(bind.url)
+    if key not in _fts_available:
+        _fts_available[key] = db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+        ).first() is not None
+    return _fts_available[key]
+
+def search_products(term, limit=SEARCH_LIMIT, in_stock=False):
+    term = (term or '').strip()
+    tokens = _tokens(term)
+    if not tokens:
+        return []
+    
+    query = Product.query.filter(Product.active)
+    if in_stock:
+        query = query.filter(Product.quantity - Product.reserved_quantity > 0)
+    
+    exact_code = db.case((db.func.lower(Product.code) == term.lower(), 0), else_=1)
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    code_prefix = Product.code.ilike(f'{escaped}%', escape='\\')
+    dialect = _dialect()
+    
+    if dialect == 'postgresql':
+        vector = db.literal_column(PG_SEARCH_VECTOR)
+        tsquery = db.func.to_tsquery(db.literal_column("'simple'::regconfig"), ' & '.join(f'{t}:*' for t in tokens))
+        query = (
+            query.filter(db.or_(vector.op('@@')(tsquery), code_prefix))
+            .order_by(exact_code, db.func.ts_rank(vector, tsquery).desc(), Product.name)
+        )
+    elif dialect == 'sqlite' and _has_sqlite_fts():
+        match = ' '.join(f'"{t}"*' for t in tokens)
+        query = (
+            query.join(db.table('products_fts'), db.text('products_fts.rowid = products.id'))
+            .filter(db.text('products_fts MATCH :match').bindparams(match=match))
+            .order_by(exact_code, db.text('bm25(products_fts)'), Product.name)
+        )
+    else:
+        conditions = [
+            db.or_(
+                Product.code.icontains(t, autoescape=True),
+                Product.name.icontains(t, autoescape=True),
+                Product.category.icontains(t, autoescape=True),
+                Product.location.icontains(t, autoescape=True)
+            )
+            for t in tokens
+        ]
+        query = query.filter(*conditions).order_by(exact_code, Product.name)
+    
+    return query.limit(max(1, min(limit, MAX_SEARCH_LIMIT))).all()
@@ -0,0 +1,36 @@
+from models import db, User, Product
+from ledger import open_balances, default_user_id
+
+DEFAULT_USERS = [
+    {'username': 'admin', 'email': 'admin@wms.com', 'name': 'Administrador', 'role': 'admin', 'password': 'admin123'},
+    {'username': 'user', 'email': 'user@wms.com', 'name': 'Usuário Teste', 'role': 'user', 'password': 'user123'},
+]
+
+SAMPLE_PRODUCTS = [
+    {'code': 'PROD001', 'name': 'Notebook Dell XPS 15', 'category': 'Eletrônicos', 'unit': 'UN', 'quantity': 25, 'min_quantity': 5, 'location': 'A1-01'},
+    {'code': 'PROD002', 'name': 'Mouse Logitech MX Master', 'category': 'Eletrônicos', 'unit': 'UN', 'quantity': 50, 'min_quantity': 10, 'location': 'A1-02'},
+    {'code': 'PROD003', 'name': 'Teclado Mecânico RGB', 'category': 'Eletrônicos', 'unit': 'UN', 'quantity': 30, 'min_quantity': 8, 'location': 'A1-03'},
+    {'code': 'PROD004', 'name': 'Monitor LG 27"', 'category': 'Eletrônicos', 'unit': 'UN', 'quantity': 15, 'min_quantity': 5, 'location': 'A2-01'},
+    {'code': 'PROD005', 'name': 'Webcam Logitech C920', 'category': 'Eletrônicos', 'unit': 'UN', 'quantity': 20, 'min_quantity': 5, 'location': 'A2-02'},
+]
+
+def seed_users():
+    if db.session.query(User.id).first() is not None:
+        return []
+    
+    for data in DEFAULT_USERS:
+        user = User(**{key: value for key, value in data.items() if key != 'password'})
+        user.set_password(data['password'])
+        db.session.add(user)
+    db.session.commit()
+    return DEFAULT_USERS
+
+def seed_products():
+    if db.session.query(Product.id).first() is not None:
+        return 0
+    
+    db.session.add_all(Product(**data) for data in SAMPLE_PRODUCTS)
+    db.session.flush()
+    open_balances(default_user_id())
+    db.session.commit()
+    return len(SAMPLE_PRODUCTS)
@@ -0,0 +1,148 @@
+const MOVEMENT_BADGES = {
+    entrada: '<span class="badge bg-success">Entrada</span>',
+    saida: '<span class="badge bg-danger">Saída</span>',
+    ajuste: '<span class="badge bg-warning">Ajuste</span>'
+};
+
+const MOVEMENT_STATS = {
+    entrada: 'entries_today',
+    saida: 'exits_today',
+    ajuste: 'adjustments_today'
+};
+
+const SHIPMENT_BADGES = {
+    pending: '<span class="badge bg-warning">Pendente</span>',
+    in_progress: '<span class="badge bg-info">Em Andamento</span>',
+    shipped: '<span class="badge bg-success">Expedido</span>'
+};
+
+let refreshNotified = false;
+
+document.addEventListener('DOMContentLoaded', function() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const source = new EventSource('/events/stream');
+    source.addEventListener('stock', e => updateProduct(JSON.parse(e.data)));
+    source.addEventListener('low_stock', e => notifyLowStock(JSON.parse(e.data)));
+    source.addEventListener('movement', e => addMovement(JSON.parse(e.data)));
+    source.addEventListener('movement_batch', e => notifyRefresh(`${JSON.parse(e.data).count} movimentações registradas.`));
+    source.addEventListener('shipment', e => updateShipment(JSON.parse(e.data)));
+    source.addEventListener('shipment_deleted', e => removeShipment(JSON.parse(e.data)));
+    source.addEventListener('refresh', () => notifyRefresh('Os dados foram alterados.'));
+});
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : value;
+    return div.innerHTML;
+}
+
+function adjustStat(name, delta) {
+    const element = document.querySelector(`[data-stat="${name}"]`);
+    if (element && delta) {
+        element.textContent = (parseInt(element.textContent, 10) || 0) + delta;
+    }
+}
+
+function notifyRefresh(message) {
+    if (refreshNotified || !document.querySelector('[data-stat]')) {
+        return;
+    }
+    refreshNotified = true;
+    showNotification(`${message} <a href="#" onclick="location.reload(); return false;">Atualizar página</a>`, 'info');
+}
+
+function stockStatusBadge(quantity, minQuantity) {
+    if (quantity <= minQuantity) {
+        return '<span class="badge bg-danger">Baixo</span>';
+    }
+    if (quantity <= minQuantity * 2) {
+        return '<span class="badge bg-warning">Médio</span>';
+    }
+    return '<span class="badge bg-success">OK</span>';
+}
+
+function updateProduct(product) {
+    if (product.previous_quantity !== null) {
+        adjustStat('total_items', product.quantity - product.previous_quantity);
+    }
+
+    const row = document.querySelector(`tr[data-product-id="${product.product_id}"]`);
+    if (!row) {
+        return;
+    }
+
+    row.querySelector('[data-field="quantity"]').textContent = product.quantity;
+    const reserved = row.querySelector('[data-field="reserved"]');
+    reserved.querySelector('span').textContent = product.reserved_quantity;
+    reserved.hidden = !product.reserved_quantity;
+    row.querySelector('[data-field="status"]').innerHTML = stockStatusBadge(product.quantity, product.min_quantity);
+
+    row.classList.add('table-info');
+    setTimeout(() => row.classList.remove('table-info'), 1500);
+}
+
+function notifyLowStock(product) {
+    adjustStat('low_stock', product.low_stock ? 1 : -1);
+    if (product.low_stock) {
+        showNotification(`Estoque baixo: ${escapeHtml(product.code)} - ${escapeHtml(product.name)} (${product.quantity})`, 'warning');
+    }
+}
+
+function addMovement(movement) {
+    adjustStat(MOVEMENT_STATS[movement.type], 1);
+    adjustStat('total_movements', 1);
+
+    const tbody = document.querySelector('tbody[data-live="movements"]');
+    if (!tbody || tbody.querySelector(`tr[data-movement-id="${movement.id}"]`)) {
+        return;
+    }
+
+    const row = tbody.insertRow(0);
+    row.dataset.movementId = movement.id;
+    row.classList.add('table-info');
+    row.innerHTML = `
+        <td>${escapeHtml(movement.created_at || 'N/A')}</td>
+        <td>${MOVEMENT_BADGES[movement.type] || ''}</td>
+        <td>${escapeHtml(movement.product_name)}</td>
+        <td><strong>${movement.quantity}</strong></td>
+        <td>${escapeHtml(movement.user_name)}</td>
+        <td>${escapeHtml(movement.notes || '-')}</td>
+        <td></td>
+    `;
+    setTimeout(() => row.classList.remove('table-info'), 1500);
+}
+
+function updateShipment(shipment) {
+    if (shipment.previous_status) {
+        adjustStat(shipment.previous_status, -1);
+    } else {
+        adjustStat('total', 1);
+    }
+    adjustStat(shipment.status, 1);
+
+    const row = document.querySelector(`tr[data-shipment-id="${shipment.id}"]`);
+    if (!row) {
+        if (!shipment.previous_status) {
+            notifyRefresh(`Nova expedição ${escapeHtml(shipment.order_number)}.`);
+        }
+        return;
+    }
+
+    row.querySelector('[data-field="status"]').innerHTML = SHIPMENT_BADGES[shipment.status] || '';
+    if (shipment.status === 'shipped') {
+        row.querySelectorAll('.shipment-select, form').forEach(element => element.remove());
+    }
+}
+
+function removeShipment(shipment) {
+    adjustStat(shipment.status, -1);
+    adjustStat('total', -1);
+
+    const row = document.querySelector(`tr[data-shipment-id="${shipment.id}"]`);
+    if (row) {
+        row.remove();
+    }
+}
@@ -0,0 +1,70 @@
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-product-search]').forEach(input => {
+        const hidden = document.getElementById(input.dataset.target);
+        const results = document.createElement('div');
+        results.className = 'list-group position-absolute w-100 shadow-sm';
+        results.style.zIndex = 1060;
+        input.parentNode.style.position = 'relative';
+        input.after(results);
+
+        let timer = null;
+        let controller = null;
+
+        input.addEventListener('input', function() {
+            hidden.value = '';
+            clearTimeout(timer);
+            const term = input.value.trim();
+            if (term.length < 2) {
+                results.innerHTML = '';
+                return;
+            }
+
+            timer = setTimeout(() => {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+
+                const params = new URLSearchParams({ q: term });
+                if (input.dataset.inStock) {
+                    params.set('in_stock', '1');
+                }
+
+                fetch(`/stock/api/search?${params}`, { signal: controller.signal })
+                    .then(response => response.json())
+                    .then(data => {
+                        results.innerHTML = '';
+                        if (!data.products.length) {
+                            results.innerHTML = '<div class="list-group-item text-muted">Nenhum produto encontrado</div>';
+                            return;
+                        }
+                        data.products.forEach(product => {
+                            const item = document.createElement('button');
+                            item.type = 'button';
+                            item.className = 'list-group-item list-group-item-action';
+                            item.textContent = `${product.code} - ${product.name} (Disponível: ${product.available_quantity})`;
+                            item.addEventListener('click', () => {
+                                hidden.value = product.id;
+                                input.value = `${product.code} - ${product.name}`;
+                                results.innerHTML = '';
+                            });
+                            results.appendChild(item);
+                        });
+                    })
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            console.error('Error searching products:', error);
+                        }
+                    });
+            }, 200);
+        });
+
+        input.form.addEventListener('submit', function(e) {
+            if (!hidden.value) {
+                e.preventDefault();
+                input.classList.add('is-invalid');
+                input.focus();
+            }
+        });
+    });
+});
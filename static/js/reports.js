@@ -1,181 +1,258 @@
+const SUMMARY_REFRESH_INTERVAL = 60000;
+
+let summaryEtag = null;
+let userStatsChart = null;
+let stockMovementsChart = null;
+let stockCategoryChart = null;
+
 document.addEventListener('DOMContentLoaded', function() {
-    loadUserStats();
-    loadStockMovements();
-    loadStockByCategory();
-    loadRecentActivities();
+    const period = document.getElementById('movementsPeriod');
+
+    loadSummary(period.value);
+    setInterval(() => loadSummary(period.value), SUMMARY_REFRESH_INTERVAL);
+
+    period.addEventListener('change', function() {
+        summaryEtag = null;
+        loadSummary(this.value);
+    });
+
+    document.querySelectorAll('[data-report-job]').forEach(button => {
+        button.addEventListener('click', function(e) {
+            e.preventDefault();
+            submitReportJob(this);
+        });
+    });
 });
 
-function loadUserStats() {
-    fetch('/reports/api/user_stats')
-        .then(response => response.json())
+function loadSummary(days = 7) {
+    fetch(`/reports/api/summary?days=${days}`, { cache: 'no-cache' })
+        .then(response => {
+            const etag = response.headers.get('ETag');
+            if (etag && etag === summaryEtag) {
+                return null;
+            }
+            summaryEtag = etag;
+            return response.json();
+        })
         .then(data => {
-            const ctx = document.getElementById('userStatsChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'doughnut',
-                data: {
-                    labels: ['Ativos', 'Inativos', 'Administradores'],
-                    datasets: [{
-                        label: 'Usuários',
-                        data: [data.active, data.inactive, data.admins],
-                        backgroundColor: [
-                            'rgba(40, 167, 69, 0.8)',
-                            'rgba(255, 193, 7, 0.8)',
-                            'rgba(220, 53, 69, 0.8)'
-                        ],
-                        borderColor: [
-                            'rgba(40, 167, 69, 1)',
-                            'rgba(255, 193, 7, 1)',
-                            'rgba(220, 53, 69, 1)'
-                        ],
-                        borderWidth: 2
-                    }]
+            if (!data) {
+                return;
+            }
+            renderUserStats(data.user_stats);
+            renderStockMovements(data.stock_movements);
+            renderStockByCategory(data.stock_by_category);
+            renderRecentActivities(data.recent_activities);
+        })
+        .catch(error => console.error('Error loading reports summary:', error));
+}
+
+function renderUserStats(data) {
+    if (userStatsChart) {
+        userStatsChart.destroy();
+    }
+    const ctx = document.getElementById('userStatsChart').getContext('2d');
+    userStatsChart = new Chart(ctx, {
+        type: 'doughnut',
+        data: {
+            labels: ['Ativos', 'Inativos', 'Administradores'],
+            datasets: [{
+                label: 'Usuários',
+                data: [data.active, data.inactive, data.admins],
+                backgroundColor: [
+                    'rgba(40, 167, 69, 0.8)',
+                    'rgba(255, 193, 7, 0.8)',
+                    'rgba(220, 53, 69, 0.8)'
+                ],
+                borderColor: [
+                    'rgba(40, 167, 69, 1)',
+                    'rgba(255, 193, 7, 1)',
+                    'rgba(220, 53, 69, 1)'
+                ],
+                borderWidth: 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
                 },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            position: 'bottom',
-                        },
-                        title: {
-                            display: true,
-                            text: `Total de Usuários: ${data.total}`
-                        }
-                    }
+                title: {
+                    display: true,
+                    text: `Total de Usuários: ${data.total}`
                 }
-            });
-        })
-        .catch(error => console.error('Error loading user stats:', error));
+            }
+        }
+    });
 }
 
-function loadStockMovements() {
-    fetch('/reports/api/stock_movements')
-        .then(response => response.json())
-        .then(data => {
-            const ctx = document.getElementById('stockMovementsChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'line',
-                data: {
-                    labels: data.labels,
-                    datasets: [
-                        {
-                            label: 'Entradas',
-                            data: data.entries,
-                            borderColor: 'rgba(40, 167, 69, 1)',
-                            backgroundColor: 'rgba(40, 167, 69, 0.2)',
-                            tension: 0.4,
-                            fill: true
-                        },
-                        {
-                            label: 'Saídas',
-                            data: data.exits,
-                            borderColor: 'rgba(220, 53, 69, 1)',
-                            backgroundColor: 'rgba(220, 53, 69, 0.2)',
-                            tension: 0.4,
-                            fill: true
-                        }
-                    ]
+function renderStockMovements(data) {
+    if (stockMovementsChart) {
+        stockMovementsChart.destroy();
+    }
+    const ctx = document.getElementById('stockMovementsChart').getContext('2d');
+    stockMovementsChart = new Chart(ctx, {
+        type: 'line',
+        data: {
+            labels: data.labels,
+            datasets: [
+                {
+                    label: 'Entradas',
+                    data: data.entries,
+                    borderColor: 'rgba(40, 167, 69, 1)',
+                    backgroundColor: 'rgba(40, 167, 69, 0.2)',
+                    tension: 0.4,
+                    fill: true
+                },
+                {
+                    label: 'Saídas',
+                    data: data.exits,
+                    borderColor: 'rgba(220, 53, 69, 1)',
+                    backgroundColor: 'rgba(220, 53, 69, 0.2)',
+                    tension: 0.4,
+                    fill: true
+                }
+            ]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'top',
                 },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            position: 'top',
-                        },
-                        title: {
-                            display: false
-                        }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                stepSize: 10
-                            }
-                        }
+                title: {
+                    display: false
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 10
                     }
                 }
-            });
-        })
-        .catch(error => console.error('Error loading stock movements:', error));
+            }
+        }
+    });
 }
 
-function loadStockByCategory() {
-    fetch('/reports/api/stock_by_category')
-        .then(response => response.json())
-        .then(data => {
-            const ctx = document.getElementById('stockCategoryChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: data.labels,
-                    datasets: [{
-                        label: 'Quantidade em Estoque',
-                        data: data.data,
-                        backgroundColor: [
-                            'rgba(54, 162, 235, 0.8)',
-                            'rgba(255, 99, 132, 0.8)',
-                            'rgba(255, 206, 86, 0.8)',
-                            'rgba(75, 192, 192, 0.8)',
-                            'rgba(153, 102, 255, 0.8)',
-                            'rgba(255, 159, 64, 0.8)'
-                        ],
-                        borderColor: [
-                            'rgba(54, 162, 235, 1)',
-                            'rgba(255, 99, 132, 1)',
-                            'rgba(255, 206, 86, 1)',
-                            'rgba(75, 192, 192, 1)',
-                            'rgba(153, 102, 255, 1)',
-                            'rgba(255, 159, 64, 1)'
-                        ],
-                        borderWidth: 2
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    plugins: {
-                        legend: {
-                            display: false
-                        }
-                    },
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                stepSize: 20
-                            }
-                        }
+function renderStockByCategory(data) {
+    if (stockCategoryChart) {
+        stockCategoryChart.destroy();
+    }
+    const ctx = document.getElementById('stockCategoryChart').getContext('2d');
+    stockCategoryChart = new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                label: 'Quantidade em Estoque',
+                data: data.data,
+                backgroundColor: [
+                    'rgba(54, 162, 235, 0.8)',
+                    'rgba(255, 99, 132, 0.8)',
+                    'rgba(255, 206, 86, 0.8)',
+                    'rgba(75, 192, 192, 0.8)',
+                    'rgba(153, 102, 255, 0.8)',
+                    'rgba(255, 159, 64, 0.8)'
+                ],
+                borderColor: [
+                    'rgba(54, 162, 235, 1)',
+                    'rgba(255, 99, 132, 1)',
+                    'rgba(255, 206, 86, 1)',
+                    'rgba(75, 192, 192, 1)',
+                    'rgba(153, 102, 255, 1)',
+                    'rgba(255, 159, 64, 1)'
+                ],
+                borderWidth: 2
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    display: false
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 20
                     }
                 }
-            });
+            }
+        }
+    });
+}
+
+function renderRecentActivities(data) {
+    const tbody = document.querySelector('#activitiesTable tbody');
+    tbody.innerHTML = '';
+    
+    data.forEach(activity => {
+        const row = tbody.insertRow();
+        
+        let badgeClass = 'secondary';
+        if (activity.type === 'Entrada') badgeClass = 'success';
+        else if (activity.type === 'Saída') badgeClass = 'danger';
+        else if (activity.type === 'Ajuste') badgeClass = 'warning';
+        
+        const badge = document.createElement('span');
+        badge.className = `badge bg-${badgeClass}`;
+        badge.textContent = activity.type;
+        row.insertCell().appendChild(badge);
+        row.insertCell().textContent = activity.item;
+        row.insertCell().textContent = `${activity.quantity > 0 ? '+' : ''}${activity.quantity}`;
+        row.insertCell().textContent = activity.date;
+    });
+}
+
+function submitReportJob(button) {
+    button.classList.add('disabled');
+    showNotification('Gerando relatório... o download começará automaticamente.', 'info');
+
+    fetch(`/reports/jobs?kind=${button.dataset.reportJob}`, { method: 'POST' })
+        .then(response => response.json())
+        .then(job => {
+            if (!job.status_url) {
+                throw new Error(job.message || 'Erro ao gerar relatório');
+            }
+            pollReportJob(job.status_url, button);
         })
-        .catch(error => console.error('Error loading stock by category:', error));
+        .catch(error => {
+            button.classList.remove('disabled');
+            showNotification(error.message, 'danger');
+        });
 }
 
-function loadRecentActivities() {
-    fetch('/reports/api/recent_activities')
+const REPORT_JOB_MAX_POLLS = 600;
+
+function pollReportJob(statusUrl, button, attempt = 1) {
+    if (attempt > REPORT_JOB_MAX_POLLS) {
+        button.classList.remove('disabled');
+        showNotification('O relatório está demorando mais que o esperado. Tente novamente mais tarde.', 'warning');
+        return;
+    }
+
+    fetch(statusUrl)
         .then(response => response.json())
-        .then(data => {
-            const tbody = document.querySelector('#activitiesTable tbody');
-            tbody.innerHTML = '';
-            
-            data.forEach(activity => {
-                const row = tbody.insertRow();
-                
-                let badgeClass = 'secondary';
-                if (activity.type === 'Entrada') badgeClass = 'success';
-                else if (activity.type === 'Saída') badgeClass = 'danger';
-                else if (activity.type === 'Ajuste') badgeClass = 'warning';
-                
-                row.innerHTML = `
-                    <td><span class="badge bg-${badgeClass}">${activity.type}</span></td>
-                    <td>${activity.item}</td>
-                    <td>${activity.quantity > 0 ? '+' : ''}${activity.quantity}</td>
-                    <td>${activity.date}</td>
-                `;
-            });
+        .then(job => {
+            if (job.status === 'done') {
+                button.classList.remove('disabled');
+                window.location = job.download_url;
+            } else if (job.status === 'failed') {
+                button.classList.remove('disabled');
+                showNotification(`Erro ao gerar relatório: ${job.error}`, 'danger');
+            } else {
+                setTimeout(() => pollReportJob(statusUrl, button, attempt + 1), 1500);
+            }
         })
-        .catch(error => console.error('Error loading recent activities:', error));
+        .catch(error => {
+            button.classList.remove('disabled');
+            console.error('Error polling report job:', error);
+        });
 }
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, User, Product, Movement, Shipment
+
+STATS_TTL = 30
+
+_cache = {}
+_lock = threading.Lock()
+
+def init_app(app):
+    app.config.setdefault('STATS_VERSION_DIR', os.path.join(tempfile.gettempdir(), 'wms_versions'))
+    os.makedirs(app.config['STATS_VERSION_DIR'], exist_ok=True)
+
+def _stamp_path(key):
+    return os.path.join(current_app.config['STATS_VERSION_DIR'], f'{key}.stamp')
+
+def data_version(key):
+    try:
+        return os.stat(_stamp_path(key)).st_mtime_ns
+    except OSError:
+        return 0
+
+def cached(key, compute, ttl=STATS_TTL):
+    now = time.monotonic()
+    version = data_version(key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry and entry[0] > now and entry[1] == version:
+            return entry[2]
+    
+    value = compute()
+    
+    if data_version(key) == version:
+        with _lock:
+            _cache[key] = (now + ttl, version, value)
+    return value
+
+def invalidate(*keys):
+    with _lock:
+        for key in keys:
+            _cache.pop(key, None)
+    
+    now = time.time_ns()
+    for key in keys:
+        path = _stamp_path(key)
+        with open(path, 'a'):
+            pass
+        os.utime(path, ns=(now, now))
+
+def today_range():
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=1)
+
+def _count_if(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def user_stats():
+    def compute():
+        total, active, admins, regular = db.session.query(
+            db.func.count(User.id),
+            _count_if(User.active.is_(True)),
+            _count_if(User.role == 'admin'),
+            _count_if(User.role == 'user')
+        ).one()
+        return {
+            'total': total,
+            'active': active,
+            'inactive': total - active,
+            'admins': admins,
+            'regular': regular
+        }
+    return cached('users', compute)
+
+def stock_stats():
+    def compute():
+        total_products, total_items, low_stock = db.session.query(
+            db.func.count(Product.id),
+            db.func.coalesce(db.func.sum(Product.quantity), 0),
+            _count_if(Product.quantity <= Product.min_quantity)
+        ).filter(Product.active).one()
+        return {
+            'total_products': total_products,
+            'total_items': total_items,
+            'low_stock': low_stock
+        }
+    return cached('stock', compute)
+
+def movement_stats():
+    def compute():
+        start, end = today_range()
+        today = dict(
+            db.session.query(Movement.type, db.func.count(Movement.id))
+            .filter(Movement.created_at >= start, Movement.created_at < end)
+            .group_by(Movement.type)
+            .all()
+        )
+        return {
+            'entries_today': today.get('entrada', 0),
+            'exits_today': today.get('saida', 0),
+            'adjustments_today': today.get('ajuste', 0),
+            'total_movements': db.session.query(db.func.count(Movement.id)).scalar()
+        }
+    return cached('movements', compute)
+
+def shipment_stats():
+    def compute():
+        counts = dict(
+            db.session.query(Shipment.status, db.func.count(Shipment.id))
+            .group_by(Shipment.status)
+            .all()
+        )
+        return {
+            'pending': counts.get('pending', 0),
+            'in_progress': counts.get('in_progress', 0),
+            'shipped': counts.get('shipped', 0),
+            'total': sum(counts.values())
+        }
+    return cached('shipments', compute)
+
+def category_stats():
+    def compute():
+        rows = (
+            db.session.query(
+                Product.category,
+                db.func.count(Product.id),
+                db.func.coalesce(db.func.sum(Product.quantity), 0),
+                _count_if(Product.quantity <= Product.min_quantity)
+            )
+            .filter(Product.active)
+            .group_by(Product.category)
+            .order_by(Product.category)
+            .all()
+        )
+        return [{
+            'category': category,
+            'skus': skus,
+            'units': units,
+            'low_stock': low_stock
+        } for category, skus, units, low_stock in rows]
+    return cached('categories', compute)
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='wms-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'wms.db')}"
+
+from app import app as flask_app
+from models import db
+from migrations import upgrade
+from seed import seed_users, seed_products
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config.update(
+        TESTING=True,
+        STATS_VERSION_DIR=os.path.join(TEST_DIR, 'versions'),
+        USER_CACHE_STAMP=os.path.join(TEST_DIR, 'user_cache.stamp'),
+        EVENTS_LOG=os.path.join(TEST_DIR, 'events.log'),
+        REPORT_JOBS_DIR=os.path.join(TEST_DIR, 'reports'),
+        METRICS_DIR=os.path.join(TEST_DIR, 'metrics'),
+    )
+    os.makedirs(flask_app.config['STATS_VERSION_DIR'], exist_ok=True)
+    os.makedirs(flask_app.config['REPORT_JOBS_DIR'], exist_ok=True)
+    os.makedirs(flask_app.config['METRICS_DIR'], exist_ok=True)
+    with flask_app.app_context():
+        upgrade()
+        seed_users()
+        seed_products()
+    return flask_app
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
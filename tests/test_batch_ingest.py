@@ -0,0 +1,39 @@
+from sqlalchemy import event
+from models import db, Product, MovementDailyRollup
+
+def _count_statements(app):
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+def test_movement_batch_uses_constant_statements(app, client, session):
+    session.execute(db.insert(Product), [
+        {'code': f'BATCH{i:03d}', 'name': f'Produto {i}', 'category': f'Categoria {i % 7}', 'quantity': 0}
+        for i in range(200)
+    ])
+    session.commit()
+    lines = [{'code': f'BATCH{i % 200:03d}', 'type': 'entrada', 'quantity': 2} for i in range(1000)]
+    
+    client.post('/movements/batch', json=lines)
+    statements, stop = _count_statements(app)
+    try:
+        response = client.post('/movements/batch', json=lines)
+    finally:
+        stop()
+    
+    assert response.get_json()['inserted'] == 1000
+    assert len(statements) < 15, statements
+    with app.app_context():
+        rollup = (
+            db.session.query(db.func.sum(MovementDailyRollup.quantity), db.func.sum(MovementDailyRollup.count))
+            .join(Product, Product.id == MovementDailyRollup.product_id)
+            .filter(Product.code.startswith('BATCH'), MovementDailyRollup.type == 'entrada')
+            .one()
+        )
+    assert tuple(rollup) == (4000, 2000)
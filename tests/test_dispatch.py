@@ -0,0 +1,43 @@
+from datetime import datetime
+from models import db, Product, Shipment, ShipmentItem
+from dispatch import dispatch_shipments
+
+def _product(session, code, quantity, reserved=0):
+    product = Product(code=code, name=f'Produto {code}', category='Testes', unit='UN',
+                      quantity=quantity, reserved_quantity=reserved)
+    session.add(product)
+    session.flush()
+    return product.id
+
+def _stock(session, product_id):
+    session.expire_all()
+    product = db.session.get(Product, product_id)
+    return product.quantity, product.reserved_quantity
+
+def _shipment(session, order_number, items, shipped=False):
+    shipment = Shipment(order_number=order_number, customer_name='Cliente', customer_address='Rua 1', user_id=1,
+                        status='shipped' if shipped else 'pending', shipped_at=datetime.utcnow() if shipped else None)
+    session.add(shipment)
+    session.flush()
+    for product_id, quantity in items:
+        session.add(ShipmentItem(shipment_id=shipment.id, product_id=product_id, quantity=quantity))
+    session.flush()
+    return shipment.id
+
+def test_dispatch_ships_what_it_can_and_reports_the_rest(session):
+    product_id = _product(session, 'INV-DISPATCH', 5, reserved=7)
+    first = _shipment(session, 'INV-D1', [(product_id, 3)])
+    second = _shipment(session, 'INV-D2', [(product_id, 4)])
+    done = _shipment(session, 'INV-D3', [(product_id, 1)], shipped=True)
+    
+    shipped, failed = dispatch_shipments([second, first, done, 999999], user_id=1)
+    
+    assert shipped == [{'id': first, 'order_number': 'INV-D1'}]
+    assert [(f['id'], f['message'].split(':')[0]) for f in failed] == [
+        (second, 'estoque insuficiente'),
+        (done, 'expedição já enviada'),
+        (999999, 'expedição não encontrada'),
+    ]
+    assert _stock(session, product_id) == (2, 4)
+    assert db.session.get(Shipment, first).shipped_at is not None
+    assert db.session.get(Shipment, second).shipped_at is None
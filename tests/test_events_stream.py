@@ -0,0 +1,52 @@
+import os
+import threading
+import events
+
+def test_stream_is_disabled_on_single_threaded_workers(app, client):
+    response = client.get('/events/stream', environ_overrides={'wsgi.multithread': False})
+    assert response.status_code == 204
+
+def test_subscribe_restarts_a_dead_listener(app, monkeypatch):
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    monkeypatch.setattr(events, '_listener', dead)
+    monkeypatch.setattr(events, '_pid', os.getpid())
+    
+    subscriber = events.subscribe(app)
+    try:
+        assert events._listener is not dead
+        assert events._listener.is_alive()
+    finally:
+        events.unsubscribe(subscriber)
+
+def test_listener_logs_errors_and_keeps_running(app, monkeypatch):
+    calls = []
+    def follow(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError('log indisponível')
+        raise SystemExit
+    monkeypatch.setattr(events, '_follow', follow)
+    monkeypatch.setattr(events, 'POLL_INTERVAL', 0)
+    subscriber = events.Subscriber()
+    events._subscribers.add(subscriber)
+    try:
+        try:
+            events._listen(app)
+        except SystemExit:
+            pass
+    finally:
+        events.unsubscribe(subscriber)
+    
+    assert len(calls) == 2
+    assert 'event: refresh' in subscriber.queue.get_nowait()
+
+def test_stream_asks_clients_to_retry_when_worker_is_full(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'EVENTS_MAX_STREAMS', 0)
+    
+    response = client.get('/events/stream', environ_overrides={'wsgi.multithread': True})
+    
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).startswith('retry: ')
+    assert not events._subscribers
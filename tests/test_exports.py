@@ -0,0 +1,20 @@
+from io import BytesIO
+from openpyxl import load_workbook
+from models import Movement
+from routes import reports
+
+FILTERS = {'start': None, 'end': None, 'product_id': None, 'product': ''}
+
+def test_xlsx_rolls_movements_over_to_continuation_sheets(session, monkeypatch):
+    monkeypatch.setattr(reports, 'EXCEL_MAX_ROWS', 4)
+    output = BytesIO()
+    
+    reports.build_xlsx(output, FILTERS)
+    
+    wb = load_workbook(BytesIO(output.getvalue()))
+    sheets = [name for name in wb.sheetnames if name.startswith('Movimentações')]
+    assert sheets[:2] == ['Movimentações', 'Movimentações (2)']
+    rows = [row for name in sheets for row in wb[name].iter_rows(min_row=2, values_only=True)]
+    assert all(wb[name].max_row <= 4 for name in sheets)
+    assert len(rows) == Movement.query.count()
+    assert {row[0] for row in rows} == {movement_id for movement_id, in session.query(Movement.id)}
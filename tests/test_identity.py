@@ -0,0 +1,41 @@
+import pytest
+from models import User
+
+@pytest.fixture
+def user_client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'user', 'password': 'user123'})
+    return client
+
+def _user_id(app):
+    with app.app_context():
+        return User.query.filter_by(username='user').one().id
+
+def test_deactivation_takes_effect_on_next_request(app, client, user_client):
+    user_id = _user_id(app)
+    assert user_client.get('/dashboard').status_code == 200
+    
+    client.post(f'/admin/toggle_status/{user_id}')
+    try:
+        response = user_client.get('/dashboard')
+        assert response.status_code == 302
+        assert '/login' in response.headers['Location']
+    finally:
+        client.post(f'/admin/toggle_status/{user_id}')
+    
+    assert user_client.get('/dashboard').status_code == 200
+
+def _signed_in_as(client):
+    page = client.get('/dashboard').get_data(as_text=True)
+    return page.split('bi-person-circle"></i>', 1)[1].split('<', 1)[0].strip()
+
+def test_edited_user_is_seen_on_next_request(app, client, user_client):
+    user_id = _user_id(app)
+    assert _signed_in_as(user_client) == 'Usuário Teste'
+    
+    form = {'username': 'user', 'email': 'user@wms.com', 'role': 'user'}
+    client.post(f'/admin/edit_user/{user_id}', data={**form, 'name': 'Usuário Renomeado'})
+    try:
+        assert _signed_in_as(user_client) == 'Usuário Renomeado'
+    finally:
+        client.post(f'/admin/edit_user/{user_id}', data={**form, 'name': 'Usuário Teste'})
@@ -0,0 +1,26 @@
+import pytest
+from flask import g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+import instrumentation
+from models import db
+
+@pytest.fixture
+def timed(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'INSTRUMENTATION_ENABLED', True)
+    event.listen(Engine, 'after_cursor_execute', instrumentation._after_cursor_execute)
+    yield
+    event.remove(Engine, 'after_cursor_execute', instrumentation._after_cursor_execute)
+
+def test_failed_statement_does_not_skew_later_timings(app, timed):
+    with app.test_request_context():
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql('SELECT * FROM missing_table')
+        connection.exec_driver_sql('SELECT 1')
+        
+        assert g.slowest_query[1] == 'SELECT 1'
+        assert g.db_time < 1000
+        assert 'query_start' not in connection.connection.info
+        db.session.rollback()
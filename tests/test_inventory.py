@@ -0,0 +1,47 @@
+import pytest
+from models import db, Product
+from inventory import apply_delta, ship_reserved, InsufficientStock
+
+def _product(session, code, quantity, reserved=0):
+    product = Product(code=code, name=f'Produto {code}', category='Testes', unit='UN',
+                      quantity=quantity, reserved_quantity=reserved)
+    session.add(product)
+    session.flush()
+    return product.id
+
+def _stock(session, product_id):
+    session.expire_all()
+    product = db.session.get(Product, product_id)
+    return product.quantity, product.reserved_quantity
+
+def test_apply_delta_updates_stock(session):
+    product_id = _product(session, 'INV-DELTA', 10)
+    
+    assert apply_delta(product_id, 5) == 15
+    assert apply_delta(product_id, -12) == 3
+    assert _stock(session, product_id) == (3, 0)
+
+def test_apply_delta_refuses_to_consume_reserved_stock(session):
+    product_id = _product(session, 'INV-SHORT', 10, reserved=8)
+    
+    with pytest.raises(InsufficientStock) as error:
+        apply_delta(product_id, -3)
+    
+    assert error.value.shortages == [(product_id, 'Produto INV-SHORT', 2, 3)]
+    assert _stock(session, product_id) == (10, 8)
+
+def test_ship_reserved_consumes_stock_and_reservation(session):
+    product_id = _product(session, 'INV-SHIP', 10, reserved=4)
+    
+    ship_reserved({product_id: 4})
+    
+    assert _stock(session, product_id) == (6, 0)
+
+def test_ship_reserved_reports_shortage_without_changes(session):
+    product_id = _product(session, 'INV-SHIP-SHORT', 2, reserved=2)
+    
+    with pytest.raises(InsufficientStock) as error:
+        ship_reserved({product_id: 3})
+    
+    assert error.value.shortages == [(product_id, 'Produto INV-SHIP-SHORT', 2, 3)]
+    assert _stock(session, product_id) == (2, 2)
@@ -0,0 +1,38 @@
+import json
+import time
+from stats import data_version
+
+def _events(app):
+    with open(app.config['EVENTS_LOG'], encoding='utf-8') as log:
+        return [json.loads(line)['event'] for line in log]
+
+def test_add_product_invalidates_movements_and_publishes_movement(app, client):
+    with app.app_context():
+        before = data_version('movements')
+    time.sleep(0.01)
+    
+    client.post('/stock/add', data={
+        'code': 'LEDGER001', 'name': 'Produto Razão', 'category': 'Testes', 'quantity': '5', 'min_quantity': '1'
+    })
+    
+    with app.app_context():
+        assert data_version('movements') > before
+    assert 'movement' in _events(app)
+
+def test_shipping_a_shipment_invalidates_movements(app, client, session):
+    from models import Product, Shipment
+    product = Product.query.filter_by(code='PROD001').one()
+    shipment = Shipment(order_number='LEDGER-SHIP', customer_name='Cliente', customer_address='Rua 1', user_id=1)
+    session.add(shipment)
+    session.commit()
+    client.post(f'/shipping/add_item/{shipment.id}', data={'product_id': product.id, 'quantity': '1'})
+    with app.app_context():
+        before = data_version('movements')
+    published = len(_events(app))
+    time.sleep(0.01)
+    
+    client.post(f'/shipping/update_status/{shipment.id}', data={'status': 'shipped'})
+    
+    with app.app_context():
+        assert data_version('movements') > before
+    assert 'movement_batch' in _events(app)[published:]
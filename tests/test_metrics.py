@@ -0,0 +1,40 @@
+import json
+import os
+import time
+import instrumentation
+
+def _worker_file(app, pid, endpoint, samples):
+    data = {
+        'pid': pid,
+        'written_at': time.time(),
+        'endpoints': {endpoint: {'requests': len(samples), 'samples': samples, 'slowest_query': [12.5, 'SELECT 1']}}
+    }
+    with open(os.path.join(app.config['METRICS_DIR'], f'{pid}.json'), 'w') as f:
+        json.dump(data, f)
+
+def test_snapshot_aggregates_every_worker(app):
+    instrumentation.reset_metrics(app)
+    time.sleep(0.01)
+    _worker_file(app, 900001, 'stock.index', [[10.0, 2.0, 3.0, 1]] * 3)
+    _worker_file(app, 900002, 'stock.index', [[40.0, 8.0, 6.0, 2]])
+    
+    endpoints, workers = instrumentation.metrics_snapshot(app)
+    
+    assert {900001, 900002, os.getpid()} <= set(workers)
+    summary = dict(endpoints)['stock.index']
+    assert summary['requests'] == 4
+    assert summary['max_queries'] == 2
+    assert summary['slowest_query'] == (12.5, 'SELECT 1')
+
+def test_reset_discards_other_workers(app):
+    _worker_file(app, 900003, 'shipping.index', [[5.0, 1.0, 1.0, 1]])
+    
+    instrumentation.reset_metrics(app)
+    endpoints, workers = instrumentation.metrics_snapshot(app)
+    
+    assert endpoints == []
+    assert 900003 not in workers
+
+def test_metrics_page_lists_worker_pids(client):
+    page = client.get('/admin/metrics').get_data(as_text=True)
+    assert str(os.getpid()) in page
@@ -0,0 +1,22 @@
+import pytest
+from models import db
+from migrations import baseline_tables
+
+def _columns(inspector, table):
+    return {column['name'] for column in inspector.get_columns(table)}
+
+def _indexes(inspector, table):
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+def test_baseline_is_the_original_schema():
+    products = {table.name: table for table in baseline_tables}['products']
+    assert 'reserved_quantity' not in products.c
+    assert 'active' not in products.c
+    assert not {table.name: table for table in baseline_tables}['movements'].indexes
+
+@pytest.mark.parametrize('table', sorted(db.metadata.tables))
+def test_migrated_schema_matches_models(session, table):
+    inspector = db.inspect(db.session.connection())
+    model = db.metadata.tables[table]
+    assert _columns(inspector, table) == {column.name for column in model.columns}
+    assert {index.name for index in model.indexes} <= _indexes(inspector, table)
@@ -0,0 +1,31 @@
+import pytest
+from models import db, Product, Movement, StockSnapshot
+from ledger import apply_movement, take_snapshots, LedgerError
+
+@pytest.mark.parametrize('movement_type, quantity', [('xyz', '7'), ('entrada', '-5'), ('saida', '0'), ('ajuste', '-1')])
+def test_add_movement_rejects_invalid_entries(app, client, movement_type, quantity):
+    with app.app_context():
+        product = Product.query.filter_by(code='PROD005').one()
+        product_id, stock = product.id, product.quantity
+        movements = Movement.query.count()
+    
+    client.post('/movements/add', data={'product_id': product_id, 'type': movement_type, 'quantity': quantity})
+    
+    with app.app_context():
+        assert Movement.query.count() == movements
+        assert db.session.get(Product, product_id).quantity == stock
+
+def test_replay_refuses_unknown_movement_types():
+    assert apply_movement(10, 'entrada', 5) == 15
+    assert apply_movement(10, 'ajuste', 3) == 3
+    with pytest.raises(LedgerError):
+        apply_movement(10, 'xyz', 7)
+
+def test_snapshots_skip_products_without_movements(session):
+    session.add(Product(code='SNAP001', name='Sem Movimentos', category='Testes', unit='UN', quantity=0))
+    session.flush()
+    
+    take_snapshots(min_movements=0)
+    
+    product = Product.query.filter_by(code='SNAP001').one()
+    assert StockSnapshot.query.filter_by(product_id=product.id).count() == 0
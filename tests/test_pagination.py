@@ -0,0 +1,17 @@
+from models import Product
+
+def test_keyset_pages_cover_every_active_product_once(app, client):
+    codes, cursor = [], None
+    while True:
+        params = {'per_page': 2}
+        if cursor:
+            params['after'] = cursor
+        page = client.get('/stock/api/products', query_string=params).get_json()
+        codes.extend(p['code'] for p in page['products'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    
+    with app.app_context():
+        expected = [p.code for p in Product.query.filter(Product.active).order_by(Product.name, Product.id)]
+    assert codes == expected
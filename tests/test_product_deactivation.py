@@ -0,0 +1,29 @@
+from models import db, Product, Movement
+
+def test_deactivating_a_product_with_movements_hides_it(client, session):
+    client.post('/stock/add', data={
+        'code': 'DEACT001', 'name': 'Produto Desativado', 'category': 'Testes', 'quantity': '3', 'min_quantity': '1'
+    })
+    product = Product.query.filter_by(code='DEACT001').one()
+    assert Movement.query.filter_by(product_id=product.id).count() > 0
+    
+    client.post(f'/stock/deactivate/{product.id}')
+    
+    session.expire_all()
+    assert db.session.get(Product, product.id).active is False
+    assert 'DEACT001' not in client.get('/stock/').get_data(as_text=True)
+    assert 'DEACT001' in client.get('/stock/?inactive=1').get_data(as_text=True)
+    assert 'DEACT001' not in [p['code'] for p in client.get('/stock/api/search?q=DEACT001').get_json()['products']]
+
+def test_deactivation_is_refused_while_stock_is_reserved(client, session):
+    from models import Shipment
+    product = Product.query.filter_by(code='PROD002').one()
+    shipment = Shipment(order_number='DEACT-SHIP', customer_name='Cliente', customer_address='Rua 1', user_id=1)
+    session.add(shipment)
+    session.commit()
+    client.post(f'/shipping/add_item/{shipment.id}', data={'product_id': product.id, 'quantity': '1'})
+    
+    client.post(f'/stock/deactivate/{product.id}')
+    
+    session.expire_all()
+    assert db.session.get(Product, product.id).active is True
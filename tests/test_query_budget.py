@@ -0,0 +1,19 @@
+import pytest
+from models import Shipment
+from instrumentation import QueryBudgetExceeded
+
+@pytest.mark.parametrize('path', ['/stock/', '/movements/', '/shipping/', '/reports/api/summary'])
+def test_pages_stay_within_query_budget(client, path):
+    assert client.get(path).status_code == 200
+
+def test_shipment_detail_within_query_budget(client, session):
+    shipment = Shipment(order_number='BUDGET-1', customer_name='Cliente', customer_address='Rua 1', user_id=1)
+    session.add(shipment)
+    session.commit()
+    
+    assert client.get(f'/shipping/view/{shipment.id}').status_code == 200
+
+def test_query_budget_exceeded_raises(app, client, monkeypatch):
+    monkeypatch.setattr(app.view_functions['stock.index'], 'query_budget', 0, raising=False)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/stock/')
@@ -0,0 +1,101 @@
+from datetime import datetime
+import pytest
+from models import db, Product, Movement, Shipment, ShipmentItem
+from pagination import keyset_filter
+from ledger import _replay_query
+
+def query_plan(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).all()
+    return ' | '.join(row[-1] for row in rows)
+
+def _stock_page():
+    return (
+        Product.query
+        .filter(Product.active == True, keyset_filter([Product.name, Product.id], ['M', 1]))
+        .order_by(Product.name, Product.id)
+        .limit(51)
+    )
+
+def _category_page():
+    return (
+        Product.query
+        .filter(Product.active == True, Product.category == 'Eletrônicos',
+                keyset_filter([Product.name, Product.id], ['M', 1]))
+        .order_by(Product.name, Product.id)
+        .limit(51)
+    )
+
+def _low_stock_page():
+    return (
+        Product.query
+        .filter(Product.active == True, Product.quantity <= Product.min_quantity)
+        .order_by(Product.name, Product.id)
+        .limit(51)
+    )
+
+def _movements_today():
+    return (
+        db.session.query(Movement.type, db.func.count(Movement.id))
+        .filter(Movement.created_at >= datetime(2026, 1, 1))
+        .group_by(Movement.type)
+    )
+
+def _product_ledger():
+    return Movement.query.filter(Movement.product_id == 1).order_by(Movement.created_at.desc()).limit(50)
+
+def _shipment_page():
+    return (
+        Shipment.query
+        .filter(keyset_filter([Shipment.created_at, Shipment.id], [datetime(2026, 1, 1), 10], descending=True))
+        .order_by(Shipment.created_at.desc(), Shipment.id.desc())
+        .limit(51)
+    )
+
+def _shipment_status_page():
+    return (
+        Shipment.query
+        .filter(Shipment.status == 'pending')
+        .order_by(Shipment.created_at.desc(), Shipment.id.desc())
+        .limit(51)
+    )
+
+def _shipment_items():
+    return (
+        db.session.query(ShipmentItem.shipment_id, db.func.count(ShipmentItem.id))
+        .filter(ShipmentItem.shipment_id.in_([1, 2, 3]))
+        .group_by(ShipmentItem.shipment_id)
+    )
+
+def _product_demand():
+    return db.session.query(db.func.sum(ShipmentItem.quantity)).filter(ShipmentItem.product_id == 1)
+
+def test_replay_seeks_past_snapshot(session):
+    plan = query_plan(_replay_query({1: 100, 2: 250}))
+    assert 'ix_movements_product_id_id (product_id=? AND id>?)' in plan, plan
+
+@pytest.mark.parametrize('build, index', [
+    (_stock_page, 'ix_products_name_id'),
+    (_category_page, 'ix_products_category_name_id'),
+    (_low_stock_page, 'ix_products_low_stock_name_id'),
+    (_movements_today, 'ix_movements_created_at_type'),
+    (_product_ledger, 'ix_movements_product_id_created_at'),
+    (_shipment_page, 'ix_shipments_created_at_id'),
+    (_shipment_status_page, 'ix_shipments_status_created_at_id'),
+    (_shipment_items, 'ix_shipment_items_shipment_id_product_id'),
+    (_product_demand, 'ix_shipment_items_product_id'),
+])
+def test_hot_query_uses_index(session, build, index):
+    plan = query_plan(build())
+    assert index in plan, plan
+    assert 'USE TEMP B-TREE FOR ORDER BY' not in plan, plan
+
+@pytest.mark.parametrize('build, seek', [
+    (_stock_page, 'SEARCH products USING INDEX ix_products_name_id (name>?)'),
+    (_category_page, 'SEARCH products USING INDEX ix_products_category_name_id (category=? AND name>?)'),
+    (_shipment_page, 'SEARCH shipments USING INDEX ix_shipments_created_at_id (created_at<?)'),
+])
+def test_keyset_page_seeks_past_cursor(session, build, seek):
+    plan = query_plan(build())
+    assert seek in plan, plan
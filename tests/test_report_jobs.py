@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+import uuid
+import jobs
+
+def _job(app, status, heartbeat_age):
+    now = time.time()
+    job = {
+        'id': uuid.uuid4().hex, 'kind': 'excel', 'extension': 'xlsx', 'download_name': 'r.xlsx',
+        'mimetype': 'application/octet-stream', 'user_id': 1, 'status': status, 'error': None,
+        'created_at': now - 3600, 'started_at': now - 3600, 'heartbeat_at': now - heartbeat_age, 'finished_at': None
+    }
+    jobs._save(job, app)
+    return job
+
+def _stale_job(app, status):
+    return _job(app, status, app.config['REPORT_JOB_STALE_AFTER'] + 1)
+
+def test_get_job_fails_jobs_abandoned_by_a_dead_worker(app):
+    job = _stale_job(app, 'running')
+    with app.app_context():
+        assert jobs.get_job(job['id'])['status'] == 'failed'
+        assert jobs.get_job(job['id'])['error']
+
+def test_long_running_jobs_with_a_heartbeat_are_not_failed(app):
+    job = _job(app, 'running', 1)
+    with app.app_context():
+        assert jobs.get_job(job['id'])['status'] == 'running'
+
+def test_jobs_owned_by_this_worker_are_not_failed(app, monkeypatch):
+    job = _stale_job(app, 'queued')
+    monkeypatch.setitem(jobs._active, job['id'], job)
+    with app.app_context():
+        assert jobs.get_job(job['id'])['status'] == 'queued'
+
+def test_cleanup_fails_stale_queued_jobs(app, monkeypatch):
+    job = _stale_job(app, 'queued')
+    monkeypatch.setattr(jobs, '_last_cleanup', 0.0)
+    
+    jobs.cleanup_expired(app)
+    
+    with open(jobs._status_path(job['id'], app)) as f:
+        assert json.load(f)['status'] == 'failed'
+
+def test_finished_run_does_not_reverse_a_reported_failure(app):
+    job = _job(app, 'queued', 0)
+    jobs._active[job['id']] = job
+    
+    def builder(output, params):
+        stale = dict(job, status='failed', error='parou de responder')
+        jobs._save(stale, app)
+        output.write(b'xlsx')
+    
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    jobs._run(app, slots, job, builder, {})
+    
+    with app.app_context():
+        assert jobs.get_job(job['id'])['status'] == 'failed'
+    assert not jobs._active
+    assert not os.path.exists(jobs.output_path(job, app))
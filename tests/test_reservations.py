@@ -0,0 +1,24 @@
+import pytest
+from models import db, Product, Shipment, ShipmentItem
+from inventory import reserve, reserve_quantities
+
+@pytest.mark.parametrize('quantity', ['0', '-5'])
+def test_add_item_rejects_non_positive_quantities(client, session, quantity):
+    product = Product.query.filter_by(code='PROD003').one()
+    reserved = product.reserved_quantity
+    shipment = Shipment(order_number=f'RESERVE{quantity}', customer_name='Cliente', customer_address='Rua 1', user_id=1)
+    session.add(shipment)
+    session.commit()
+    
+    client.post(f'/shipping/add_item/{shipment.id}', data={'product_id': product.id, 'quantity': quantity})
+    
+    session.expire_all()
+    assert db.session.get(Product, product.id).reserved_quantity == reserved
+    assert ShipmentItem.query.filter_by(shipment_id=shipment.id).count() == 0
+
+def test_reserve_guards_non_positive_quantities(session):
+    product = Product.query.filter_by(code='PROD003').one()
+    with pytest.raises(ValueError):
+        reserve(product.id, -1)
+    with pytest.raises(ValueError):
+        reserve_quantities({product.id: -1})
@@ -0,0 +1,33 @@
+import pytest
+from models import db, Product, Shipment
+
+def _shipment(session, order_number):
+    shipment = Shipment(order_number=order_number, customer_name='Cliente', customer_address='Rua 1', user_id=1)
+    session.add(shipment)
+    session.commit()
+    return shipment.id
+
+def _status(app, shipment_id):
+    with app.app_context():
+        shipment = db.session.get(Shipment, shipment_id)
+        return shipment.status, shipment.shipped_at
+
+def test_update_status_rejects_unknown_status(app, client, session):
+    shipment_id = _shipment(session, 'STATUS-BAD')
+    
+    client.post(f'/shipping/update_status/{shipment_id}', data={'status': 'lost'})
+    
+    assert _status(app, shipment_id) == ('pending', None)
+
+@pytest.mark.parametrize('status', ['pending', 'in_progress'])
+def test_shipped_shipments_cannot_go_back(app, client, session, status):
+    product = Product.query.filter_by(code='PROD004').one()
+    shipment_id = _shipment(session, f'STATUS-BACK-{status}')
+    client.post(f'/shipping/add_item/{shipment_id}', data={'product_id': product.id, 'quantity': '1'})
+    client.post(f'/shipping/update_status/{shipment_id}', data={'status': 'shipped'})
+    
+    client.post(f'/shipping/update_status/{shipment_id}', data={'status': status})
+    
+    shipped_status, shipped_at = _status(app, shipment_id)
+    assert shipped_status == 'shipped'
+    assert shipped_at is not None
@@ -0,0 +1,21 @@
+import time
+from models import Product
+
+def test_summary_revalidates_with_etag(app, client):
+    first = client.get('/reports/api/summary')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    
+    cached = client.get('/reports/api/summary', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    
+    with app.app_context():
+        product_id = Product.query.filter_by(code='PROD001').one().id
+    time.sleep(0.01)
+    client.post('/movements/add', data={'product_id': product_id, 'type': 'entrada', 'quantity': '1'})
+    
+    changed = client.get('/reports/api/summary', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['recent_activities']